@@ -0,0 +1,135 @@
+"""
+Portfolio report builder
+~~~~
+build every project defined in source/*.py and generate its documents,
+sites run in a process pool and a failing site doesn't stop the others.
+>>> python main.py                          all source/*.py
+>>> python main.py source/vlp_*.py -w 4     glob and workers
+>>> python main.py cbl_hsanjose qsc_cecofin module names
+"""
+import argparse
+import glob
+import importlib
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+#headless rendering on workers
+os.environ.setdefault('MPLBACKEND','Agg')
+
+def discover(patterns:list[str])->list[str]:
+    """source module names (eg: source.cbl_hsanjose) from globs, paths or names"""
+    modules:list[str] = []
+    for pattern in patterns:
+        if not pattern.endswith('.py') and not any(it in pattern for it in '*?[/\\'):
+            pattern = f'source/{pattern}.py'
+        for file in sorted(glob.glob(pattern)):
+            path = Path(file)
+            if path.name.startswith('_'):
+                continue
+            module = '.'.join(path.with_suffix('').parts)
+            if module not in modules:
+                modules.append(module)
+    return modules
+
+def build(data:dict):
+    """Project from a source data dict, as in main_builder notebook"""
+    from models.inventory import Project # pylint: disable=import-outside-toplevel
+
+    project = Project(**data['project'])
+    project.building.add_consumptions(**data['consumptions'])
+
+    components = data['components']
+    project.add_generator(*components['generator'])
+    project.add_component(*components['install'])
+    if 'storage' in components:
+        project.add_storage(*components['storage'])
+    project.add_component(*components['accesories'])
+    project.bucket.set_overloads(**components['overloads'])
+    return project
+
+def run(module:str,plot_workers:int|None=None,sidecar:str|None=None)->dict:
+    """build and generate documents of one site, errors returned as result"""
+    start = time.perf_counter()
+    try:
+        from models.plotter import generate_docs # pylint: disable=import-outside-toplevel
+        data = importlib.import_module(module).data
+        generate_docs(build(data),plot_workers=plot_workers,sidecar=sidecar)
+        return {'site':module,'status':'ok','seconds':time.perf_counter()-start,'error':None}
+    except Exception as error: # pylint: disable=broad-exception-caught
+        return {
+            'site':module,
+            'status':'failed',
+            'seconds':time.perf_counter()-start,
+            'error':f'{type(error).__name__}: {error}',
+            'traceback':traceback.format_exc(),
+            }
+
+def summary(results:list[dict],elapsed:float)->str:
+    """timing table"""
+    width = max([len(it['site']) for it in results]+[4])
+    lines = [f"{'site':<{width}}  {'status':<6}  {'seconds':>8}  error"]
+    for it in sorted(results,key=lambda it:it['site']):
+        lines.append(f"{it['site']:<{width}}  {it['status']:<6}  {it['seconds']:>8.1f}  {it['error'] or ''}")
+    failed = sum(it['status'] != 'ok' for it in results)
+    lines.append(
+        f"{len(results)} sites, {failed} failed, "
+        f"{sum(it['seconds'] for it in results):.1f} s site time, {elapsed:.1f} s wall time")
+    return '\n'.join(lines)
+
+def main(argv:list[str]|None=None)->int:
+    """command line entry point, exit code 1 if any site failed"""
+    parser = argparse.ArgumentParser(description='generate reports for source/ projects')
+    parser.add_argument('sites',nargs='*',default=['source/*.py'],
+                        help='globs, paths or module names in source/ (default: source/*.py)')
+    parser.add_argument('-w','--workers',type=int,default=os.cpu_count(),
+                        help='parallel sites, 1 runs in this process')
+    parser.add_argument('-p','--plot-workers',type=int,default=None,
+                        help='figure rendering processes by site (default: cpu count over site workers)')
+    parser.add_argument('--sidecar',choices=['csv.gz','parquet'],default=None,
+                        help='also store hourly tables in this format')
+    parser.add_argument('-v','--verbose',action='store_true',help='print failures traceback')
+    args = parser.parse_args(argv)
+
+    modules = discover(args.sites)
+    if not modules:
+        print('no source modules found for',args.sites)
+        return 1
+
+    workers = max(1,min(args.workers,len(modules)))
+    plot_workers = args.plot_workers or max(1,(os.cpu_count() or 1)//workers)
+
+    start = time.perf_counter()
+    results:list[dict] = []
+    if workers <= 1:
+        for module in modules:
+            results.append(run(module,plot_workers,args.sidecar))
+            print('finished',module,results[-1]['status'])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = {pool.submit(run,module,plot_workers,args.sidecar):module for module in modules}
+            for job in as_completed(jobs):
+                try:
+                    result = job.result()
+                except Exception as error: # pylint: disable=broad-exception-caught
+                    #worker process died
+                    result = {'site':jobs[job],'status':'failed','seconds':0.0,
+                              'error':f'{type(error).__name__}: {error}'}
+                results.append(result)
+                print('finished',result['site'],result['status'])
+
+    if args.verbose:
+        for it in results:
+            if it.get('traceback'):
+                print(f"\n{it['site']}\n{it['traceback']}")
+
+    print(summary(results,time.perf_counter()-start))
+    return 1 if any(it['status'] != 'ok' for it in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# End-of-file (EOF)
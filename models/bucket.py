@@ -3,6 +3,7 @@ from typing import Callable, Self
 from pandas import DataFrame
 from models.components import Component, Specs
 from models.econometrics import Cost, Currency
+from models.memo import Revision
 
 @dataclass
 class BucketItem:
@@ -38,23 +39,34 @@ class BucketItem:
 
 
 
-class Bucket:
+class Bucket(Revision):
     """contains list of materials and operations required fo project
     >>> methods
         ... subtotal(currency): total amount before overloads
         ... overloads(curr): calc overloads cost
+        ... overload_rate(): overloads fraction over subtotal
         ... total(curr): net worth after overloads
             ... total().tax() : tax amount
             ... total().gross(): total gross
     """
 
-    items:list[BucketItem]=[]
+    items:list[BucketItem]
 
     def __init__(self,**overloads:float):
+        super().__init__()
+        self.items:list[BucketItem] = []
         self._overloads=overloads
 
+    def __deepcopy__(self,memo:dict)->Self:
+        """own items list and overloads, items are records shared between copies"""
+        bucket = Bucket(**self._overloads)
+        bucket.items = list(self.items)
+        bucket.revision = self.revision
+        return bucket
+
     def add_item(self,gloss:str,*items:Component):
         """increment and ordered bucket list"""
+        self.touch()
         for it in items:
             self.items.append(BucketItem(
                 gloss=gloss,
@@ -82,12 +94,18 @@ class Bucket:
 
         return ol
 
+    def overload_rate(self)->float:
+        """overloads sum as a fraction of subtotal"""
+        return sum(self._overloads.values())/100
+
     def set_overloads(self,**overloads:float):
         """add or patch overloads values"""
+        self.touch()
         self._overloads.update(overloads)
 
     def reset_overloads(self):
         """reset overloads to ZERO"""
+        self.touch()
         self._overloads = {}
 
     def total(self)->Cost:
@@ -4,11 +4,14 @@ import datetime
 from enum import Enum
 from typing import Callable, Literal, Self
 import numpy as np
+from numpy import ndarray
 from sklearn.linear_model import LinearRegression
 
 import pandas as pd
 from pandas import DataFrame
 from models.econometrics import Cost, Currency
+from models.load_profile import Profile, hourly_load
+from models.memo import Revision
 
 class Energetic(Enum):
     '''
@@ -134,7 +137,9 @@ type IRushHour = Literal['NA','PP','PPP']
 class Fare:
     '''
     Fare electric billing :default BT1A
+    ... INJECTION_FACTOR: netbilling injected energy paid over consumption unit cost
     '''
+    INJECTION_FACTOR:float = 1-0.07
     def __init__(self,
                 tension:Tension = Tension.BT,
                 contract:Contract = Contract._1A,
@@ -148,6 +153,10 @@ class Fare:
         '''return properly compose fare'''
         return self.tension.value +'-'+ self.contract.value +((' '+self.rush_hour.value) if self.rush_hour.value != '' else '')
 
+    def injection_price(self,unit_cost):
+        '''unit price of energy injected to grid, same shape as unit_cost'''
+        return unit_cost*self.INJECTION_FACTOR
+
     def __str__(self)->str:
         return self.get_fare()
 
@@ -192,10 +201,10 @@ class ElectricityBill(EnergyBill):
         return adapter_cfg(self)
 
 
-class Consumption:
+class Consumption(Revision):
     """global energy billing and estimate  projection in 12 month"""
 
-    _records:list[EnergyBill]=[]
+    _records:list[EnergyBill]
     _cost_increment_rate:float=1
     _index=0
 
@@ -205,8 +214,12 @@ class Consumption:
         client_id:str=None,
         measurer_id:str=None,
         contract_id:str=None,
+        profile:Profile='24/7',
         ) -> None:
+        super().__init__()
+        self._records:list[EnergyBill] = []
         self.energetic = energetic
+        self.profile:Profile = profile
         self.property = properties[energetic]
         self.client_id:str=client_id,
         self.measurer_id:str=measurer_id,
@@ -214,12 +227,14 @@ class Consumption:
 
     def set_bill(self,*billing:EnergyBill)->None:
         """set list o single billing"""
+        self.touch()
         self._records = [*self._records,*billing]
         #acs sorting by date
         self._records.sort(key=lambda bill:bill.date_billing)
 
     def set_cost_increment(self,percentage:float=0):
         """set cost increment factor"""
+        self.touch()
         if percentage >= 0 and percentage<=100:
             self._cost_increment_rate = (percentage/100)+1
         else:
@@ -238,6 +253,11 @@ class Consumption:
             self._records)
             )
     @property
+    def fare(self)->Fare:
+        """fare of last bill, default BT1A"""
+        return getattr(self._records[-1],'fare',Fare()) if self._records else Fare()
+
+    @property
     def total_consumption(self)->tuple[float,str]:
         """return total sum"""
         return sum(list(map(lambda it:it.energy,self._records))),"kWh"
@@ -299,6 +319,17 @@ class Consumption:
 
         return df[['month','unit_cost','energy','total']]
 
+    def hourly_forecast(self,dates=None,year:int|None=None,profile:Profile|None=None)->ndarray:
+        """forecast energy spread hourly by load profile (own profile if None), kWh,
+        over dates or, without them, the whole calendar year"""
+        forecast = self.forecast().sort_values('month')
+        return hourly_load(
+            forecast['energy'].to_numpy(dtype=float),
+            profile or self.profile,
+            dates,
+            year,
+            )
+
     def _calc_cost_increment(self,data:DataFrame,weight:float=1.0)->pd.DataFrame:
         """estimate cost incremental by unitary volume clp/kWh
         >>>includes
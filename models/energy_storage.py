@@ -1,5 +1,10 @@
+from dataclasses import dataclass
 from functools import reduce
 from typing import Literal
+import numpy as np
+from numpy import ndarray
+import pandas as pd
+from pandas import DataFrame
 from models.components import Component, Specs
 from models.econometrics import Cost
 
@@ -20,6 +25,187 @@ class EnergyStorage(Component):
 type Voltage = Literal[12,24,48,110,220,380,400]
 type Regime = Literal['24/7','16/7','8/7','24/5','16/5','8/5',]
 
+#operation hours by daily regime [start,end)
+REGIME_HOURS:dict[int,tuple[int,int]] = {24:(0,24),16:(6,22),8:(9,17)}
+
+def regime_mask(dates,regime:Regime='24/7')->ndarray:
+    """
+    operation schedule
+    ~~~~
+    True on hours the building operates, regime as 'hours per day/days per week':
+    5 days Monday to Friday, 16 hours from 6:00 to 22:00, 8 hours from 9:00 to 17:00.
+    """
+    hours_per_day,days_per_week = [int(it) for it in regime.split('/')]
+    stamps = pd.DatetimeIndex(dates)
+    start,end = REGIME_HOURS[hours_per_day]
+    mask = (stamps.hour >= start) & (stamps.hour < end)
+    if days_per_week < 7:
+        mask &= stamps.dayofweek < days_per_week
+    return np.asarray(mask)
+
+@dataclass
+class Dispatch:
+    """
+    hourly dispatch result, one value per bank capacity [kWh]
+    >>> fields
+    ... capacity: nominal bank energy
+    ... charged/discharged: energy in/out of the bank
+    ... curtailment: production surplus not stored
+    ... unmet: load not supplied by production nor bank
+    ... cycles: equivalent full cycles over usable capacity
+    ... soc: (hours x capacities) state of charge, only if requested
+    """
+    capacity:ndarray
+    load:float
+    charged:ndarray
+    discharged:ndarray
+    curtailment:ndarray
+    unmet:ndarray
+    cycles:ndarray
+    soc:ndarray|None = None
+
+    @property
+    def self_sufficiency(self)->ndarray:
+        """fraction of load supplied by production and bank"""
+        return 1-self.unmet/self.load if self.load > 0 else np.ones_like(self.unmet)
+
+    def to_frame(self)->DataFrame:
+        """summary by capacity"""
+        return DataFrame({
+            'capacity_kwh':self.capacity,
+            'charged_kwh':self.charged,
+            'discharged_kwh':self.discharged,
+            'curtailment_kwh':self.curtailment,
+            'unmet_kwh':self.unmet,
+            'cycles':self.cycles,
+            'self_sufficiency':self.self_sufficiency,
+            })
+
+def simulate_dispatch(
+    production:ndarray,
+    load:ndarray,
+    capacity:float|ndarray,
+    charge_efficiency:float = 0.95,
+    discharge_efficiency:float = 0.95,
+    depth_of_discharge:float = 0.5,
+    initial_soc:float = 1.0,
+    schedule:ndarray|None = None,
+    keep_soc:bool = False,
+    )->Dispatch:
+    """
+    Hourly battery dispatch
+    ~~~~
+    state of charge simulation over hourly production and load [kWh],
+    for many bank capacities at once (each hour step is a vector operation).
+    >>> rules
+    ... surplus charges the bank up to capacity, remaining is curtailed
+    ... deficit discharges the bank down to depth_of_discharge, remaining is unmet
+    ... schedule: boolean operation hours, load outside them is zero
+    """
+    production = np.nan_to_num(np.asarray(production,dtype=float))
+    load = np.nan_to_num(np.asarray(load,dtype=float))
+    if schedule is not None:
+        load = np.where(schedule,load,0.0)
+    capacity = np.atleast_1d(np.asarray(capacity,dtype=float))
+
+    #net energy is shared by all capacities
+    net = production-load
+    floor = capacity*(1-depth_of_discharge)
+    soc = capacity*initial_soc
+    charged = np.zeros_like(capacity)
+    discharged = np.zeros_like(capacity)
+    curtailment = np.zeros_like(capacity)
+    unmet = np.zeros_like(capacity)
+    history = np.empty((net.size,capacity.size)) if keep_soc else None
+
+    for hour,balance in enumerate(net.tolist()):
+        if balance >= 0:
+            stored = np.minimum(balance*charge_efficiency,capacity-soc)
+            soc += stored
+            charged += stored
+            curtailment += balance-stored/charge_efficiency
+        else:
+            supplied = np.minimum(-balance,(soc-floor)*discharge_efficiency)
+            supplied = np.maximum(supplied,0)
+            soc -= supplied/discharge_efficiency
+            discharged += supplied
+            unmet += -balance-supplied
+        if history is not None:
+            history[hour] = soc
+
+    usable = capacity*depth_of_discharge
+    with np.errstate(divide='ignore',invalid='ignore'):
+        cycles = np.where(usable > 0,discharged/discharge_efficiency/usable,0.0)
+
+    return Dispatch(
+        capacity=capacity,
+        load=float(load.sum()),
+        charged=charged,
+        discharged=discharged,
+        curtailment=curtailment,
+        unmet=unmet,
+        cycles=cycles,
+        soc=history,
+        )
+
+def size_bank(
+    production:ndarray,
+    load:ndarray,
+    unit_storage:float,
+    unit_cost:float,
+    quantities:list[int]|ndarray = range(1,201),
+    target_self_sufficiency:float|None = None,
+    hours_autonomy:float|None = None,
+    schedule:ndarray|None = None,
+    **dispatch:float,
+    )->tuple[DataFrame,dict|None]:
+    """
+    Battery bank sizing
+    ~~~~
+    evaluates all candidate unit quantities in one dispatch simulation over the same
+    production/load arrays, returns the table and the least-cost bank meeting targets.
+    >>> inputs
+    ... unit_storage: kWh per battery, unit_cost: cost per battery
+    ... target_self_sufficiency: fraction of load supplied by production and bank
+    ... hours_autonomy: usable bank energy over average operation hour demand
+    ... dispatch: simulate_dispatch efficiencies and depth_of_discharge
+    >>> result
+    ... (DataFrame by quantity, best row dict or None if no candidate meets targets)
+    """
+    quantity = np.asarray(quantities,dtype=int)
+    result = simulate_dispatch(
+        production=production,
+        load=load,
+        capacity=quantity*unit_storage,
+        schedule=schedule,
+        **dispatch,
+        )
+    table = result.to_frame()
+    table.insert(0,'quantity',quantity)
+    table['cost'] = quantity*unit_cost
+
+    #autonomy, usable energy over mean demand on operation hours
+    demand = np.asarray(load,dtype=float)
+    operation = schedule if schedule is not None else demand > 0
+    hourly_demand = float(np.nanmean(demand[operation])) if operation.any() else 0.0
+    usable = table['capacity_kwh']*dispatch.get('depth_of_discharge',0.5)\
+        *dispatch.get('discharge_efficiency',0.95)
+    table['hours_autonomy'] = usable/hourly_demand if hourly_demand > 0 else np.inf
+
+    valid = np.ones(len(table),dtype=bool)
+    if target_self_sufficiency is not None:
+        valid &= table['self_sufficiency'].to_numpy() >= target_self_sufficiency
+    if hours_autonomy is not None:
+        valid &= table['hours_autonomy'].to_numpy() >= hours_autonomy
+
+    if not valid.any():
+        return table,None
+
+    candidates = table.loc[valid]
+    best = candidates.loc[candidates['cost'].idxmin()].to_dict()
+    best['quantity'] = int(best['quantity'])
+    return table,best
+
 class Battery(EnergyStorage):
     """Battery is set in function of certain demand
     >>> variables
@@ -27,6 +213,7 @@ class Battery(EnergyStorage):
     ...charge: in ampere-hour
     ...demand: array of 12 month energy energy demand by month
     ...autonomy: how many days of supply is specked
+    ...efficiency/depth_of_discharge: hourly dispatch simulation
      """
     def __init__(
         self,
@@ -38,6 +225,9 @@ class Battery(EnergyStorage):
         demand:list[float] = None,#kWh
         hours_autonomy:int=1,#number of hours
         use_regime:Regime='24/7',
+        charge_efficiency:float=0.95,
+        discharge_efficiency:float=0.95,
+        depth_of_discharge:float=0.5,#GEL deep cycle
         ) -> None:
         #battery specification
         self.volt = volt
@@ -66,6 +256,33 @@ class Battery(EnergyStorage):
         self.hours_autonomy = hours_autonomy
         self.charge = charge
         self.hourly_avg_demand = hourly_avg_demand
+        self.use_regime = use_regime
+        self.charge_efficiency = charge_efficiency
+        self.discharge_efficiency = discharge_efficiency
+        self.depth_of_discharge = depth_of_discharge
+
+    @property
+    def capacity(self)->float:
+        """bank nominal energy in kWh"""
+        return self.storage*self.quantity
+
+    def simulate(self,production:DataFrame,load:ndarray,keep_soc:bool=False)->Dispatch:
+        """
+        hourly dispatch of this bank
+        >>> inputs
+        ... production: Photovoltaic.get_energy() like DataFrame
+        ... load: hourly demand kWh, same length as production
+        """
+        return simulate_dispatch(
+            production=production['System_capacity_KW'].to_numpy(),
+            load=load,
+            capacity=self.capacity,
+            charge_efficiency=self.charge_efficiency,
+            discharge_efficiency=self.discharge_efficiency,
+            depth_of_discharge=self.depth_of_discharge,
+            schedule=regime_mask(production['date UTC'],self.use_regime),
+            keep_soc=keep_soc,
+            )
 
     def set_energy_demand(self,demand:list[float],use_regime:Regime='24/7'):
         """config new energy storage set"""
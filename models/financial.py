@@ -0,0 +1,283 @@
+"""financial evaluation over scenario batches and Monte Carlo uncertainty"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from numpy import ndarray
+from pandas import DataFrame
+
+def npv(rate:float|ndarray,flows:ndarray)->ndarray:
+    """net present value by scenario, flows (scenarios x periods) period 0 first"""
+    flows = np.atleast_2d(np.asarray(flows,dtype=float))
+    periods = np.arange(flows.shape[1])
+    discount = (1+np.reshape(rate,(-1,1)).astype(float))**-periods
+    return (flows*discount).sum(axis=1)
+
+def irr(flows:ndarray,guess:float=0.1,iterations:int=100,tolerance:float=1e-9)->ndarray:
+    """
+    internal rate of return by scenario, Newton iterations over all rows at once,
+    NaN when flows don't change sign, don't converge or the rate is under -99%
+    """
+    flows = np.atleast_2d(np.asarray(flows,dtype=float))
+    periods = np.arange(flows.shape[1])
+    rate = np.full(flows.shape[0],guess)
+
+    for _ in range(iterations):
+        discount = (1+rate[:,None])**-periods
+        value = (flows*discount).sum(axis=1)
+        slope = -(periods*flows*discount).sum(axis=1)/(1+rate)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            step = np.where(slope != 0,value/slope,0.0)
+        rate = np.maximum(rate-step,-0.99)
+        if np.all(np.abs(step) < tolerance):
+            break
+
+    residual = np.abs(npv(rate,flows))
+    scale = np.abs(flows).sum(axis=1)
+    valid = (flows.min(axis=1) < 0) & (flows.max(axis=1) > 0) & (residual <= 1e-6*scale)
+    return np.where(valid,rate,np.nan)
+
+def payback(flows:ndarray,rate:float|ndarray=0)->ndarray:
+    """
+    periods until accumulated flows recover investment, interpolated inside the period,
+    discounted when rate > 0, NaN if never recovered
+    """
+    flows = np.atleast_2d(np.asarray(flows,dtype=float))
+    periods = np.arange(flows.shape[1])
+    discounted = flows*(1+np.reshape(rate,(-1,1)).astype(float))**-periods
+    accumulated = discounted.cumsum(axis=1)
+
+    recovered = accumulated >= 0
+    first = recovered.argmax(axis=1)
+    rows = np.arange(flows.shape[0])
+    previous = accumulated[rows,np.maximum(first-1,0)]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        fraction = np.where(first > 0,-previous/discounted[rows,first],0.0)
+    return np.where(recovered.any(axis=1),np.maximum(first-1,0)+fraction,np.nan)
+
+def cash_flows(
+    investment:float|ndarray,
+    income:float|ndarray,
+    n_years:int|ndarray = 10,
+    escalation:float|ndarray = 1.0,
+    )->ndarray:
+    """
+    (scenarios x periods) cash flows, investment at period 0 and
+    income escalated each year, scenarios broadcast over every argument,
+    periods past a shorter horizon are zero
+    """
+    investment,income,n_years,escalation = np.broadcast_arrays(
+        np.asarray(investment,dtype=float),
+        np.asarray(income,dtype=float),
+        np.asarray(n_years,dtype=int),
+        np.asarray(escalation,dtype=float),
+        )
+    investment,income,n_years,escalation = (np.atleast_1d(it).ravel() for it in (investment,income,n_years,escalation))
+    periods = np.arange(int(n_years.max()))
+
+    flows = np.zeros((investment.size,periods.size+1))
+    flows[:,0] -= investment
+    flows[:,1:] = np.where(
+        periods < n_years[:,None],
+        income[:,None]*escalation[:,None]**periods,
+        0.0)
+    return flows
+
+def lcoe(costs:ndarray,energy:ndarray,rate:float|ndarray)->ndarray:
+    """levelized cost of energy by scenario, discounted costs over discounted energy,
+    costs and energy (scenarios x periods)"""
+    with np.errstate(divide='ignore',invalid='ignore'):
+        return npv(rate,costs)/npv(rate,energy)
+
+@dataclass
+class Evaluation:
+    """financial results by scenario"""
+    npv:ndarray
+    irr:ndarray
+    payback:ndarray
+    discounted_payback:ndarray
+    lcoe:ndarray
+
+    def to_frame(self)->DataFrame:
+        """one row per scenario"""
+        return DataFrame(self.__dict__)
+
+def evaluate(
+    flows:ndarray,
+    rate:float|ndarray,
+    energy:ndarray|None = None,
+    costs:ndarray|None = None,
+    )->Evaluation:
+    """
+    Batch financial evaluation
+    ~~~~
+    NPV, IRR, simple and discounted payback and LCOE of every scenario in one call
+    >>> args
+    ... flows: (scenarios x periods) net cash flows, period 0 first
+    ... rate: discount rate, scalar or one by scenario
+    ... energy: (scenarios x periods) energy kWh for LCOE, NaN LCOE if None
+    ... costs: (scenarios x periods) costs for LCOE, default flows outgoings
+    """
+    flows = np.atleast_2d(np.asarray(flows,dtype=float))
+    if energy is None:
+        levelized = np.full(flows.shape[0],np.nan)
+    else:
+        costs = -np.minimum(flows,0) if costs is None else costs
+        levelized = lcoe(costs,np.broadcast_to(energy,flows.shape),rate)
+
+    return Evaluation(
+        npv=npv(rate,flows),
+        irr=irr(flows),
+        payback=payback(flows),
+        discounted_payback=payback(flows,rate),
+        lcoe=levelized,
+        )
+
+def tornado(table:DataFrame,metric:str='npv')->DataFrame:
+    """metric at lowest and highest change of each variable, widest swing first,
+    table as Project.sensitivity"""
+    by_variable = table.groupby('variable',sort=False)['change']
+    low = table.loc[by_variable.idxmin()].set_index('variable')[metric]
+    high = table.loc[by_variable.idxmax()].set_index('variable')[metric]
+    res = DataFrame({'low':low,'high':high})
+    res['swing'] = (res['high']-res['low']).abs()
+    return res.sort_values('swing',ascending=False).reset_index()
+
+def spider(table:DataFrame,metric:str='npv')->DataFrame:
+    """metric by change (rows) and variable (columns), table as Project.sensitivity"""
+    return table.pivot(index='change',columns='variable',values=metric)
+
+def _evaluate(flows:ndarray,rate:float)->ndarray:
+    """(npv, irr, payback) rows for a flows batch"""
+    return np.vstack([npv(rate,flows),irr(flows),payback(flows)])
+
+@dataclass
+class Uncertainty:
+    """
+    Monte Carlo input distributions
+    >>> fields
+    ... loss_spread: each operational loss triangular between (1-spread) and (1+spread) its value
+    ... escalation_sd: normal deviation of yearly tariff escalation around cost increment
+    ... exchange_sd: lognormal deviation of exchange rates, over imported investment share
+    ... degradation: normal (mean, deviation) of yearly production degradation,
+    ... compounded over years in place of the static 'degradation' operational loss
+    ... weather years are drawn uniformly from available yearly production
+    """
+    loss_spread:float = 0.5
+    escalation_sd:float = 0.01
+    exchange_sd:float = 0.10
+    degradation:tuple[float,float] = (0.005,0.002)
+
+@dataclass
+class MonteCarloResult:
+    """
+    Monte Carlo outcome, one value per draw
+    >>> fields
+    ... npv, irr, payback: financial results
+    ... energy: first year generation kWh
+    ... flows: (draws x periods) cash flows
+    """
+    npv:ndarray
+    irr:ndarray
+    payback:ndarray
+    energy:ndarray
+    flows:ndarray
+
+    def exceedance(self,metric:str,levels:tuple[int,...]=(50,90))->dict[str,float]:
+        """Pxx value of metric exceeded in xx% of draws, payback is exceeded in (100-xx)%
+        so P90 stays the conservative figure"""
+        values = getattr(self,metric)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return {f'P{level}':float('nan') for level in levels}
+        if metric == 'payback':
+            return {f'P{level}':float(np.percentile(values,level)) for level in levels}
+        return {f'P{level}':float(np.percentile(values,100-level)) for level in levels}
+
+    def summary(self,levels:tuple[int,...]=(50,90))->DataFrame:
+        """mean and Pxx by metric"""
+        rows = []
+        for metric in ('energy','npv','irr','payback'):
+            values = getattr(self,metric)
+            rows.append({
+                'metric':metric,
+                'mean':float(np.nanmean(values)) if np.any(~np.isnan(values)) else float('nan'),
+                **self.exceedance(metric,levels),
+                'defined':float(np.mean(~np.isnan(values))),
+                })
+        return DataFrame(rows)
+
+def monte_carlo(
+    income:float,
+    investment:float,
+    energy:float,
+    yearly_energy:ndarray,
+    losses:dict[str,float],
+    escalation:float = 1.0,
+    imported_share:float = 0.0,
+    n_years:int = 10,
+    rate:float = 6/100,
+    draws:int = 10_000,
+    uncertainty:Uncertainty|None = None,
+    seed:int|None = None,
+    workers:int|None = None,
+    )->MonteCarloResult:
+    """
+    Monte Carlo financial analysis
+    ~~~~
+    all draws are sampled as arrays and cash flows built as one (draws x periods) matrix,
+    income scales with drawn production over the deterministic one.
+    >>> args
+    ... income: first year deterministic income (savings and netbilling)
+    ... investment: deterministic investment, same currency as income
+    ... energy: deterministic yearly production kWh, income reference
+    ... yearly_energy: production kWh of each weather year, drawn relative to their mean
+    ... losses: operational losses fractions, as Photovoltaic.OPERATIONAL_LOSS,
+    ... its 'degradation' entry is not sampled but replaced by yearly degradation
+    ... escalation: yearly tariff multiplier, as Consumption.get_cost_increment
+    ... imported_share: investment fraction priced in foreign currency
+    ... workers: process pool size for metrics, None or 1 in process
+    """
+    uncertainty = uncertainty or Uncertainty()
+    rng = np.random.default_rng(seed)
+
+    #production: weather year x operational losses
+    yearly_energy = np.asarray(yearly_energy,dtype=float)
+    weather = rng.choice(yearly_energy,size=draws)/yearly_energy.mean()
+    #deterministic energy carries every loss, degradation is drawn yearly below
+    total_loss = sum(losses.values())
+    loss = np.fromiter((value for key,value in losses.items() if key != 'degradation'),dtype=float)
+    sampled_loss = rng.triangular(
+        loss*(1-uncertainty.loss_spread),
+        loss,
+        loss*(1+uncertainty.loss_spread)+1e-12,
+        size=(draws,loss.size)).sum(axis=1)
+    production = weather*(1-sampled_loss)/(1-total_loss)
+
+    #economy: tariff escalation, exchange and degradation
+    growth = rng.normal(escalation,uncertainty.escalation_sd,size=draws)
+    exchange = rng.lognormal(0,uncertainty.exchange_sd,size=draws)
+    degradation = np.clip(rng.normal(*uncertainty.degradation,size=draws),0,None)
+
+    flows = cash_flows(
+        investment=investment*(1-imported_share+imported_share*exchange),
+        income=income*production,
+        n_years=n_years,
+        escalation=growth*(1-degradation),
+        )
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_evaluate,np.array_split(flows,workers),[rate]*workers))
+        metrics = np.hstack(parts)
+    else:
+        metrics = _evaluate(flows,rate)
+
+    return MonteCarloResult(
+        npv=metrics[0],
+        irr=metrics[1],
+        payback=metrics[2],
+        energy=energy*production,
+        flows=flows,
+        )
+
+# End-of-file (EOF)
@@ -1,6 +1,10 @@
 """cos sin op"""
 import math
 from datetime import datetime
+from threading import Lock
+import numpy as np
+from numpy import ndarray
+import pandas as pd
 from sun_position_calculator import SunPositionCalculator
 class GeoPosition:
     """
@@ -12,10 +16,16 @@ class GeoPosition:
         ... altitude: degrees = None
     >>> methods
         ... .sun_position(datetime)->{elevation:degrees°,azimuth:degrees°}
+        ... .sun_positions(datetime array)->{elevation:array°,azimuth:array°}
         azimuth = 0° north,
         azimuth = 180° south
     """
     _calculator = SunPositionCalculator()
+    #suncalc ephemeris constants, same as SunPositionCalculator
+    _J1970 = 2440588
+    _J2000 = 2451545
+    _OBLIQUITY = math.radians(23.4397)
+    _PERIHELION = math.radians(102.9372)
     def __init__(
         self,
         latitude:float=-31.6322,#default lat
@@ -32,34 +42,135 @@ class GeoPosition:
         pos = self._calculator.pos(timestamp,self.latitude,self.longitude)
         return {'azimuth':math.degrees(pos.azimuth),'elevation':math.degrees(pos.altitude)}
 
+    def sun_positions(self,dates,utc_offset:float|None=None)->dict[str,ndarray]:#in degrees
+        """
+        vectorized sun_position
+        ~~~~
+        elevation and azimuth of the king sun for a whole datetime array, in one pass.
+        >>> time reference
+        ... tz-aware dates are converted to UTC.
+        ... naive dates are local time shifted by utc_offset hours,
+        ... by default local solar time (LST) of this site: longitude/15.
+        """
+        stamps = pd.DatetimeIndex(dates)
+        if stamps.tz is not None:
+            stamps = stamps.tz_convert('UTC').tz_localize(None)
+        else:
+            offset = self.longitude/15 if utc_offset is None else utc_offset
+            stamps = stamps - pd.to_timedelta(offset,unit='h')
+
+        #days since J2000 epoch
+        unix_days = stamps.asi8/(86_400*10**9)
+        days = unix_days - 0.5 + self._J1970 - self._J2000
+
+        #sun ecliptic coordinates
+        mean_anomaly = np.radians(357.5291 + 0.98560028*days)
+        center = np.radians(
+            1.9148*np.sin(mean_anomaly)
+            + 0.02*np.sin(2*mean_anomaly)
+            + 0.0003*np.sin(3*mean_anomaly))
+        ecliptic = mean_anomaly + center + self._PERIHELION + math.pi
+        declination = np.arcsin(np.sin(ecliptic)*math.sin(self._OBLIQUITY))
+        ascension = np.arctan2(np.sin(ecliptic)*math.cos(self._OBLIQUITY),np.cos(ecliptic))
+
+        #observer horizontal coordinates
+        phi = math.radians(self.latitude)
+        hour_angle = np.radians(280.16 + 360.9856235*days) + math.radians(self.longitude) - ascension
+        azimuth = np.arctan2(
+            np.sin(hour_angle),
+            np.cos(hour_angle)*math.sin(phi) - np.tan(declination)*math.cos(phi)) + math.pi
+        altitude = np.arcsin(
+            math.sin(phi)*np.sin(declination)
+            + math.cos(phi)*np.cos(declination)*np.cos(hour_angle))
+
+        return {'azimuth':np.degrees(azimuth),'elevation':np.degrees(altitude)}
+
     @property
     def gmaps(self)->str:
         """return google maps link"""
         return f'https://www.google.com/maps/@{self.latitude},{self.longitude},200m/data=!3m1!1e3?entry=ttu'
 
+class SunPositionCache:
+    """
+    Shared sun position storage
+    ~~~~
+    sun azimuth/elevation arrays are computed once per site and time grid,
+    every surface orientation over the same weather reuses them.
+    >>> methods
+        ... SunPositionCache.get(GeoPosition,dates)->{elevation:array°,azimuth:array°}
+        ... SunPositionCache.clear()
+    """
+    MAX_ENTRIES:int = 32
+    _store:dict[tuple,dict[str,ndarray]] = {}
+    _lock = Lock()
+
+    @staticmethod
+    def _key(location:GeoPosition,dates,utc_offset:float|None)->tuple:
+        """latitude, longitude and time grid fingerprint"""
+        stamps = pd.DatetimeIndex(dates)
+        return (
+            location.latitude,
+            location.longitude,
+            utc_offset,
+            str(stamps.tz),
+            len(stamps),
+            hash(stamps.asi8.tobytes()),
+            )
+
+    @classmethod
+    def get(cls,location:GeoPosition,dates,utc_offset:float|None=None)->dict[str,ndarray]:
+        """stored sun position for this site and dates, calc on first request"""
+        key = cls._key(location,dates,utc_offset)
+        with cls._lock:
+            if key in cls._store:
+                return cls._store[key]
+
+        sun = location.sun_positions(dates,utc_offset)
+        #shared between instances, read only
+        for values in sun.values():
+            values.setflags(write=False)
+
+        with cls._lock:
+            if len(cls._store) >= cls.MAX_ENTRIES:
+                #drop oldest entry
+                cls._store.pop(next(iter(cls._store)))
+            cls._store[key] = sun
+
+        return sun
+
+    @classmethod
+    def clear(cls)->None:
+        """remove all stored sun positions"""
+        with cls._lock:
+            cls._store.clear()
+
 class Orientation:
-    "elevation and azimuth in degrees"
+    """elevation and azimuth in degrees,
+    column arrays of inclination/azimuth broadcast cos_phi for orientation sweeps"""
     def __init__(self,inclination:float = 33.0,azimuth:float = 0) -> None:
         self.inclination = inclination
         self.normal:float = inclination
         self.azimuth = azimuth
 
-    def cos_phi(self, sun_azimuth:float,sun_elevation:float)->float:
-        """cos(Phi), phi: difference between normal and sun position, angles input in degrees"""
+    def cos_phi(self, sun_azimuth:float|ndarray,sun_elevation:float|ndarray)->float|ndarray:
+        """cos(Phi), phi: difference between normal and sun position, angles input in degrees,
+        works on single values or on whole arrays of sun positions"""
+        elevation = np.radians(sun_elevation)
+        azimuth = np.radians(sun_azimuth)
         [x_sun,y_sun,z_sun] = [
-            math.cos(math.radians(sun_elevation))*math.cos(math.radians(sun_azimuth)),
-            math.cos(math.radians(sun_elevation))*math.sin(math.radians(sun_azimuth)),
-            math.sin(math.radians(sun_elevation))
+            np.cos(elevation)*np.cos(azimuth),
+            np.cos(elevation)*np.sin(azimuth),
+            np.sin(elevation)
             ]
 
-        normal = {'elevation':self.inclination,'azimuth':self.azimuth}
+        normal = {'elevation':np.radians(self.inclination),'azimuth':np.radians(self.azimuth)}
         [x_nor,y_nor,z_nor] = [
-            math.sin(math.radians(normal['elevation']))*math.cos(math.radians(normal['azimuth'])),
-            math.sin(math.radians(normal['elevation']))*math.sin(math.radians(normal['azimuth'])),
-            math.cos(math.radians(normal['elevation']))
+            np.sin(normal['elevation'])*np.cos(normal['azimuth']),
+            np.sin(normal['elevation'])*np.sin(normal['azimuth']),
+            np.cos(normal['elevation'])
             ]
         cos_phi = x_sun*x_nor + y_sun*y_nor + z_sun*z_nor
-        return cos_phi if cos_phi>=0 else 0
+        return np.maximum(cos_phi,0)
 
 # Create a datetime object from the string
 
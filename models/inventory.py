@@ -1,22 +1,22 @@
 """main wrapper dependencies"""
+from copy import deepcopy
 from functools import reduce
 import json
-from math import log
 
 from datetime import datetime
-from typing import Any,  Literal
+from typing import Any,  Literal, Self
 
 
 from dotenv import dotenv_values
 import matplotlib.pyplot as plt
 import numpy
+from numpy import ndarray
 import pandas as pd
 from pandas import DataFrame
 from docxtpl import DocxTemplate,RichText
 from uuid import uuid1 # pylint: disable=no-name-in-module
 # pylint: disable=no-member
 # error
-from pyxirr import irr, npv # pylint: disable=no-name-in-module
 import requests # pylint: disable=no-member
 
 from models.bucket import Bucket
@@ -24,12 +24,16 @@ from models.components import Component, Specs, Tech
 from models.consumption import Consumption, Energetic, EnergyBill
 from models.econometrics import Cost, Currency
 from models.emission import Emission
-from models.energy_storage import Battery, EnergyStorage,Regime
+from models.financial import MonteCarloResult, Uncertainty, cash_flows, evaluate, monte_carlo
+from models.energy_storage import Battery, EnergyStorage,Regime, regime_mask, size_bank
 from models.generator import EnergyGenerator
-from models.geometry import GeoPosition
-from models.photovoltaic import Photovoltaic, PvFactory, PvInput
-from models.weather import Weather
-from models.weather import WeatherParam as W
+from models.geometry import GeoPosition, Orientation
+from models.load_profile import Profile
+from models.memo import Memo
+from models.photovoltaic import Photovoltaic, PvFactory, PvInput, exceedance
+from models.report import ReportSession
+from models.sizing import size_array
+from models.weather import PV_PARAMETERS, Weather, WeatherMode
 
 # from models.photovoltaic import Photovoltaic
 
@@ -44,13 +48,14 @@ class Building:
     ... city
     building config like geolocation, name and basics operations"""
 
-    consumptions:dict[str,Consumption] ={}
+    consumptions:dict[str,Consumption]
 
     def __init__(self,
                 geolocation:tuple[float,float,float|None],
                 name:str,
                 address:str,
                 city:str):
+        self.consumptions = {}
         self.geolocation = GeoPosition(*geolocation)
         self.name=name
         self.address=address
@@ -65,9 +70,10 @@ class Building:
         cost_increment:float=0,
         description:str='main',
         consumption:list[EnergyBill]=None,
+        profile:Profile='24/7',
         ):
-        '''defining energy bill, '''
-        instance=Consumption(energetic,client_id,measurer_id,contract_id)
+        '''defining energy bill, profile: hourly load shape or Regime'''
+        instance=Consumption(energetic,client_id,measurer_id,contract_id,profile)
         instance.set_cost_increment(cost_increment)
         instance.set_bill(*consumption)
         self.consumptions[description] = instance
@@ -83,6 +89,15 @@ class Building:
         return container
 
 
+    def hourly_consumption(self,group:list[str],dates=None,profile:Profile|None=None)->ndarray:
+        """hourly sum of consumption groups kWh,
+        each one with its own load profile unless profile is given"""
+        return reduce(
+            lambda total,it:total+self.consumptions[it].hourly_forecast(dates,profile=profile),
+            group[1:],
+            self.consumptions[group[0]].hourly_forecast(dates,profile=profile),
+            )
+
     def plot_consumption_forecast(self,group:list[str]):
         "generate graph"
         data:DataFrame = self.consumption_forecast(
@@ -94,6 +109,7 @@ class Building:
         plt.savefig("build/plot_consumption_forecast.png")
 
 type Connection = Literal['hybrid','netbilling','ongrid','offgrid']
+type Settlement = Literal['monthly','hourly']
 
 
 class Project:
@@ -102,12 +118,18 @@ class Project:
     ~~~~
     ... building: @Building Class
     ... technology: @Tech Enum Class
+    ... weather_years / weather_mode: multi-year weather, 'tmy' for typical year
+    ... settlement: netbilling balance over 'monthly' sums or 'hourly' load profile
+    >>> state is own by each instance
+    ... .copy() -> independent project sharing read only weather
+    ... .snapshot() / .restore(snapshot) -> what-if changes
     """
-    components:dict[str,list[Component]] = {}
+    components:dict[str,list[Component]]
     generation_group_id:str = "generation"
-    bucket:Bucket = Bucket()
-    power_production:DataFrame|None = None # local storage energy daily generation
-    _performance:DataFrame = DataFrame()
+    bucket:Bucket
+    power_production:DataFrame|None # local storage energy daily generation
+    SENSITIVITY:tuple[str,...] = ('capex','tariff','escalation','overloads','yield')
+    _performance:DataFrame
 
     def __init__(
         self,
@@ -115,6 +137,9 @@ class Project:
         connection_type:Connection,
         building:Building,
         technology:list[Tech]|None = None,
+        weather_years:int = 1,
+        weather_mode:WeatherMode = 'last',
+        settlement:Settlement = 'monthly',
         ) -> None:
 
 
@@ -124,16 +149,41 @@ class Project:
         self.building = building
         self.title:str = title + ' ' + self._connection_type_local(connection_type)
         self.connection_type=connection_type
+        self.settlement:Settlement = settlement
+
+        #project state, own by instance
+        self.components = {}
+        self.bucket = Bucket()
+        self.power_production = None
+        self._performance = DataFrame()
+        self._memo = Memo()
 
         #weather env
         print('getting weather data...')
         self.weather = Weather(building.geolocation,\
-            [W.TEMPERATURE,W.DIRECT,W.DIFFUSE,W.ALBEDO,W.ZENITH,W.WIND_SPEED_10M])
+            PV_PARAMETERS,
+            years=weather_years,
+            mode=weather_mode)
         self.weather.get_data()
 
         #currency init
         self._load_exchanges()
 
+    def copy(self)->Self:
+        """
+        independent project: building, consumptions, components, bucket and stored results
+        are copied, weather is read only and shared
+        """
+        return deepcopy(self,{id(self.weather):self.weather})
+
+    def snapshot(self)->Self:
+        """copy of current state, to restore() after what-if changes"""
+        return self.copy()
+
+    def restore(self,snapshot:Self)->None:
+        """bring back a snapshot state, the snapshot stays reusable"""
+        self.__dict__.update(snapshot.copy().__dict__)
+
     @property
     def connection_type_local(self)->str:
         """name in local spanish lang ES-cl"""
@@ -179,6 +229,136 @@ class Project:
 
         self.add_component('generación',*eq,generator=True)
 
+    def orientation_sweep(
+        self,
+        inclinations:list[float] = range(0,61,5),
+        azimuths:list[float] = range(-90,91,5),
+        equipment:PvFactory|None = None,
+        )->tuple[DataFrame,dict[str,float]]:
+        """
+        annual generation over a grid of orientations on this site weather
+        >>> equipment
+        ... None: first generation component with its quantity
+        ... PvFactory: one single panel of that model
+        """
+        if equipment is not None:
+            panel = equipment.factory(
+                weather=self.weather,
+                description='sweep',
+                quantity=1,
+                orientation=Orientation())
+        else:
+            generators = self.components.get(self.generation_group_id,[])
+            panel = next((it for it in generators if isinstance(it,Photovoltaic)),None)
+
+        if panel is None:
+            raise ValueError('no photovoltaic component found')
+
+        return panel.sweep_orientation(inclinations,azimuths)
+
+    def size_generator(
+        self,
+        equipment:PvFactory,
+        orientations:list[Orientation],
+        areas:list[float]|None = None,
+        max_panels:int|None = None,
+        inverters:dict[str,Component]|None = None,
+        cost_per_panel:float|None = None,
+        fixed_cost:float = 0,
+        target_self_consumption:float|None = None,
+        n_years:int = 10,
+        rate:float = 6/100,
+        consumptions:list[str]|None = None,
+        connection:Connection = 'netbilling',
+        settlement:Settlement|None = None,
+        profile:Profile|None = None,
+        )->tuple[DataFrame,dict|None]:
+        """
+        Panel quantity optimizer
+        ~~~~
+        one panel production is simulated once per orientation and scaled by quantity,
+        faces fill best yield first up to their area, NPV with bucket overloads.
+        >>> args
+        ... equipment: panel model, eg panelRepo['CS 655W']
+        ... orientations / areas: roof faces and their m2, unlimited if None
+        ... max_panels: search limit, default faces capacity or 150% of yearly consumption
+        ... inverters: candidates, eg warehouse['Inverter']
+        ... cost_per_panel: panel and per panel works CLP, default panel cost
+        ... fixed_cost: quantity independent costs CLP
+        ... target_self_consumption: min share of generation consumed on site
+        >>> result as sizing.size_array: (table by quantity, best row|None)
+        """
+        group = consumptions if consumptions else ['main']
+        settlement = settlement or self.settlement
+        forecast = self.building.consumption_forecast(group=group).sort_values('month')
+        fare = self.building.consumptions[group[0]].fare
+        unit_cost = forecast['unit_cost'].to_numpy(dtype=float)
+
+        panels = [
+            equipment.factory(weather=self.weather,description='sizing',quantity=1,orientation=it)
+            for it in orientations]
+        hourly = numpy.vstack([it.get_energy()['System_capacity_KW'].to_numpy(dtype=float) for it in panels])
+        hourly = numpy.nan_to_num(hourly)
+        month = panels[0].get_energy()['month'].to_numpy(dtype=int)
+
+        if settlement == 'hourly':
+            unit_generation = hourly
+            load = self.building.hourly_consumption(group,panels[0].get_energy()['date UTC'],profile)
+        else:
+            unit_generation = numpy.vstack([numpy.bincount(month,weights=it,minlength=13)[1:] for it in hourly])
+            load = forecast['energy'].to_numpy(dtype=float)
+            month = numpy.arange(1,13)
+
+        if areas is not None:
+            capacity = numpy.floor(numpy.asarray(areas,dtype=float)/equipment.technical_sheet.area).astype(int)
+            max_panels = max_panels or int(capacity.sum())
+        if max_panels is None:
+            best_yield = unit_generation.sum(axis=1).max()
+            max_panels = int(numpy.ceil(1.5*forecast['energy'].sum()/best_yield)) if best_yield > 0 else 1
+        if areas is None:
+            capacity = numpy.full(len(orientations),max_panels)
+
+        return size_array(
+            unit_generation=unit_generation,
+            load=load,
+            month=month,
+            unit_cost=unit_cost,
+            injection_price=fare.injection_price(unit_cost),
+            capacity=capacity,
+            panel_power=equipment.technical_sheet.power/1000,
+            cost_per_panel=equipment.cost.net(Currency.CLP)[0] if cost_per_panel is None else cost_per_panel,
+            fixed_cost=fixed_cost,
+            overload_rate=self.bucket.overload_rate(),
+            inverters=inverters,
+            quantities=range(1,max_panels+1),
+            target_self_consumption=target_self_consumption,
+            connection=connection,
+            n_years=n_years,
+            rate=rate,
+            escalation=self.building.consumptions['main'].get_cost_increment,
+            )
+
+    def _battery(self,hours_autonomy:int,regime:Regime)->Battery:
+        """default 250Ah GEL equipment"""
+        return Battery(
+            description='Baterías',
+            specifications=Specs(
+                category='Storage',
+                brand='MaxPower',
+                model='MP GEL12-250',
+                ref_url='https://www.tiendatecnored.cl/bateria-gel-ciclo-profundo-12v-250ah.html',
+                specs_url='https://www.tiendatecnored.cl/media/wysiwyg/ficha-tecnica/4703148.pdf',
+                clase='Ciclo Profundo',
+                tipo='GEL'
+                ),
+            cost_per_unit=Cost(305_990,Currency.CLP),
+            volt=12,
+            charge=250,
+            demand=self.building.consumption_forecast(['main'])['energy'].to_list(),
+            hours_autonomy=hours_autonomy,
+            use_regime=regime,
+        )
+
     def add_storage(
         self,
         tag:str,
@@ -192,27 +372,64 @@ class Project:
 
         self.add_component(
             tag,
-            Battery(
-                description='Baterías',
-                specifications=Specs(
-                    category='Storage',
-                    brand='MaxPower',
-                    model='MP GEL12-250',
-                    ref_url='https://www.tiendatecnored.cl/bateria-gel-ciclo-profundo-12v-250ah.html',
-                    specs_url='https://www.tiendatecnored.cl/media/wysiwyg/ficha-tecnica/4703148.pdf',
-                    clase='Ciclo Profundo',
-                    tipo='GEL'
-                    ),
-                cost_per_unit=Cost(305_990,Currency.CLP),
-                volt=12,
-                charge=250,
-                demand=self.building.consumption_forecast(['main'])['energy'].to_list(),
-                hours_autonomy=hours_autonomy,
-                use_regime=regime,
-            ),
+            self._battery(hours_autonomy,regime),
             *extra_component
         )
 
+    def hourly_demand(self,profile:Profile|None=None,consumptions:list[str]|None=None)->ndarray:
+        """hourly demand kWh aligned with energy production,
+        monthly forecast spread by load profile, consumption own profile if None"""
+        dates = self.energy_production()['date UTC']
+        return self.building.hourly_consumption(
+            group=consumptions or ['main'],
+            dates=dates,
+            profile=profile,
+            )
+
+    def size_storage(
+        self,
+        regime:Regime,
+        target_self_sufficiency:float|None = None,
+        hours_autonomy:float|None = None,
+        max_units:int = 200,
+        )->tuple[DataFrame,dict|None]:
+        """
+        least-cost default battery bank meeting self-sufficiency and/or autonomy targets,
+        evaluated over simulated hourly dispatch against this project production
+        """
+        battery = self._battery(hours_autonomy=int(hours_autonomy or 1),regime=regime)
+        production = self.energy_production()
+        return size_bank(
+            production=production['System_capacity_KW'].to_numpy(),
+            load=self.hourly_demand(regime),
+            unit_storage=battery.storage,
+            unit_cost=battery.cost.net(Currency.CLP)[0],
+            quantities=range(1,max_units+1),
+            target_self_sufficiency=target_self_sufficiency,
+            hours_autonomy=hours_autonomy,
+            schedule=regime_mask(production['date UTC'],regime),
+            charge_efficiency=battery.charge_efficiency,
+            discharge_efficiency=battery.discharge_efficiency,
+            depth_of_discharge=battery.depth_of_discharge,
+            )
+
+    def add_optimal_storage(
+        self,
+        tag:str,
+        regime:Regime,
+        target_self_sufficiency:float|None = None,
+        hours_autonomy:float|None = None,
+        *extra_component:Component)->dict|None:
+        """add default battery bank sized by size_storage(), None if no bank meets targets"""
+        _,best = self.size_storage(regime,target_self_sufficiency,hours_autonomy)
+        if best is None:
+            return None
+
+        battery = self._battery(hours_autonomy=int(hours_autonomy or 1),regime=regime)
+        battery.set_quantity(best['quantity'])
+        self.add_component(tag,battery,*extra_component)
+        return best
+
     def has_storage(self)->bool:
         """check storage capability"""
         for _,group in self.components.items():
@@ -224,13 +441,19 @@ class Project:
 
 
 
-    def energy_production(self)->DataFrame|None:
-        """extract and sum all energy generation component"""
+    def _production_key(self)->tuple:
+        """inputs of energy production, state of every generation component"""
+        return tuple(
+            #other components are held by the key itself, so none can take their place
+            it.energy_key() if isinstance(it,Photovoltaic) else (it,it.quantity)
+            for it in self.components.get(self.generation_group_id,[]))
 
-        #check object local storage
-        if self.power_production is not None:
-            return self.power_production
+    def energy_production(self)->DataFrame|None:
+        """extract and sum all energy generation component,
+        stored until a generation component changes"""
+        return self._memo.get('production',self._production_key(),self._calc_production)
 
+    def _calc_production(self)->DataFrame:
         number_of_components:int  = len(self.components[self.generation_group_id])
 
         #check for generation component content
@@ -258,30 +481,101 @@ class Project:
                     (container['IRR_incident'] + aux_component['IRR_incident'])/2
 
         #storage in local param
-        self.power_production:DataFrame = container
+        self.power_production = container
 
         return container
 
+    def energy_exceedance(self,levels:tuple[int,...]=(50,90))->dict[str,float]:
+        """P50/P90 annual generation [kWh] over weather years of all generation components"""
+        generators = self.components[self.generation_group_id]
+        yearly = sum(it.yearly_energy()['System_capacity_KW'].to_numpy() for it in generators)
+        return exceedance(yearly,levels)
+
     def production_array(self)->list[DataFrame]:
         "get energy production DataFrame PER generation unit module"
         return list(map(lambda unit:unit.get_energy(),self.components[self.generation_group_id]))
 
     def performance(self,
                     consumptions:list[str]=None,
-                    connection:Connection = 'netbilling',):
+                    connection:Connection = 'netbilling',
+                    settlement:Settlement|None = None,
+                    profile:Profile|None = None,):
         """generates monthly result for
-        savings and netbilling performance"""
+        savings and netbilling performance
+        >>> settlement
+        ... monthly: generation against consumption monthly sums
+        ... hourly: generation against hourly load (consumption profile unless profile given),
+            injections and self consumption summed by month
+        """
+        group = consumptions if consumptions else ['main']
+        settlement = settlement or self.settlement
+        key = (
+            self._production_key(),
+            tuple((it.token,it.revision,it.profile) for it in map(self.building.consumptions.get,group)),
+            connection,
+            settlement,
+            profile,
+            )
 
-        production:DataFrame = self.energy_production()[["month","System_capacity_KW"]]\
-            .groupby(["month"],as_index=False).sum()
+        #local storage
+        self._performance = self._memo.get('performance',key,
+            lambda:self._calc_performance(group,connection,settlement,profile))
+        return self._performance
 
-        future:DataFrame = self.building.consumption_forecast(
-            group=consumptions if consumptions else ['main'],
-            )
+    def _calc_performance(
+        self,
+        group:list[str],
+        connection:Connection,
+        settlement:Settlement,
+        profile:Profile|None,
+        )->DataFrame:
+        future:DataFrame = self.building.consumption_forecast(group=group)
+
+        res = self._settle(future,group,connection,settlement,profile)
 
+        #emissions
+        res['benefits'] = res['savings']*res['unit_cost']#"+res['netbilling']*res['unit_cost']
+        fare = self.building.consumptions[group[0]].fare
+        res['netbilling_income'] = res['netbilling']*fare.injection_price(res['unit_cost'])
+
+
+        eva_period = datetime.now().year +1
+        res['CO2 kg'] = res['generation']*self.emissions.annual_projection(eva_period)
+
+        return res
+
+    def _settle(
+        self,
+        future:DataFrame,
+        group:list[str],
+        connection:Connection,
+        settlement:Settlement,
+        profile:Profile|None = None,
+        scale:float = 1.0,
+        )->DataFrame:
+        """consumption forecast with generation, netbilling and savings by month,
+        generation scaled by scale without new production calculation"""
+        if settlement == 'hourly':
+            res = future.merge(right=self._hourly_settlement(group,profile,scale),how='left')
+            res = res.rename(columns={'energy':'consumption'})
+            match connection:
+                case 'ongrid':
+                    res['netbilling'] = 0.0
+                case 'offgrid':
+                    res['netbilling'] = 0.0
+                    res['savings'] = res['generation']
+            return res
+
+        production:DataFrame = self.energy_production()[["month","System_capacity_KW"]]\
+            .groupby(["month"],as_index=False).sum()
+        production['System_capacity_KW'] *= scale
         res = future.merge(right=production,how='left')
         res = res.rename(columns={'energy':'consumption','System_capacity_KW':'generation'})
+        return self._monthly_settlement(res,connection)
 
+    @staticmethod
+    def _monthly_settlement(res:DataFrame,connection:Connection)->DataFrame:
+        """netbilling and savings over monthly sums"""
         match connection:
             case 'netbilling':#energy sell to net
                 #when energy generation is bigger than consumption return delta, else 0
@@ -322,19 +616,34 @@ class Project:
                     res['generation'],
                     res['generation']
                     )
-        #emissions
-        res['benefits'] = res['savings']*res['unit_cost']#"+res['netbilling']*res['unit_cost']
-        res['netbilling_income'] = res['netbilling']*res['unit_cost']*(1-0.07)#"+res['netbilling']*res['unit_cost']
-
-
-        eva_period = datetime.now().year +1
-        res['CO2 kg'] = res['generation']*self.emissions.annual_projection(eva_period)
-
-        #local storage
-        self._performance = res
-
         return res
 
+    def _hourly_settlement(
+        self,
+        consumptions:list[str],
+        profile:Profile|None = None,
+        scale:float = 1.0,
+        )->DataFrame:
+        """hourly production against load, summed by month:
+        generation, netbilling (injected) and savings (self consumed) kWh"""
+        production = self.energy_production()
+        generation = numpy.nan_to_num(production['System_capacity_KW'].to_numpy(dtype=float))*scale
+        load = self.hourly_demand(profile,consumptions)
+        month = production['month'].to_numpy(dtype=int)
+
+        self_consumed = numpy.minimum(generation,load)
+        injected = generation-self_consumed
+
+        def by_month(values:ndarray)->ndarray:
+            return numpy.bincount(month,weights=values,minlength=13)[1:]
+
+        return DataFrame({
+            'month':numpy.arange(1,13),
+            'generation':by_month(generation),
+            'netbilling':by_month(injected),
+            'savings':by_month(self_consumed),
+            })
+
     @property
     def nominal_power(self)->tuple[float,list[float]]:
         "system capacity in kW"
@@ -372,31 +681,43 @@ class Project:
         return float(f'{area:.2f}')
 
     def economical_analysis(self,currency:Currency,n_years:int=10,rate:float = 6/100,fmt=False):
-        """"VAN TIR flux financial analysis"""
+        """"VAN TIR flux financial analysis,
+        stored until performance, bucket or cost increment change"""
+        key = (
+            self._memo.key('performance'),
+            self.bucket.token,
+            self.bucket.revision,
+            self.building.consumptions['main'].token,
+            self.building.consumptions['main'].revision,
+            currency,
+            n_years,
+            rate,
+            fmt,
+            )
+        return self._memo.get(('finance',fmt),key,lambda:self._calc_economical_analysis(currency,n_years,rate,fmt))
 
+    def _calc_economical_analysis(self,currency:Currency,n_years:int,rate:float,fmt:bool):
         investment = self.bucket.total().value
         income_by_saving:float = self._performance['benefits'].sum()
         income_by_netbilling:float = self._performance['netbilling_income'].sum()
         ratio = self.building.consumptions['main'].get_cost_increment
 
-        flux_by_saving = [0,*[float(income_by_saving*(ratio**period)) for period in range(n_years)]]
-        flux_by_netbilling = [0,*[float(income_by_netbilling*(ratio**period)) for period in range(n_years)]]
-        flux_by_inv= [-investment,*[0]*n_years]
-
-        flux:list[float] = [flux_by_saving[i]+flux_by_netbilling[i]+flux_by_inv[i] for i in range(len(flux_by_saving))]
-        flux_acc:list[float]=[]
-
-        flux_acc:list[float] = [] #project sum flux
-        for i,period in enumerate(flux):
-            if i == 0:
-                flux_acc.append(period)
-                continue
-
-            flux_acc.append(flux_acc[i-1]+period)
+        #rows: savings, netbilling, investment
+        parts = cash_flows(
+            investment=[0,0,investment],
+            income=[income_by_saving,income_by_netbilling,0],
+            n_years=n_years,
+            escalation=ratio,
+            )
+        flux_by_saving,flux_by_netbilling,_ = parts.tolist()
+        flux = parts.sum(axis=0)
+        flux_acc:list[float] = flux.cumsum().tolist() #project sum flux
 
-        res_npv = npv(rate,flux)
-        res_irr = irr(flux)
-        res_sri = self._ir(rate_cost=rate,flux=flux,method='exact')
+        result = evaluate(flux,rate)
+        res_npv = float(result.npv[0])
+        res_irr = float(result.irr[0])
+        res_sri = float(result.discounted_payback[0])
+        flux:list[float] = flux.tolist()
 
         if fmt:
             return {'rate':f'{rate*100:.1f}%',
@@ -423,6 +744,114 @@ class Project:
                 'npv_bool':res_npv>0,
                 'irr_bool':res_irr>0.05,
                 }
+    def monte_carlo(
+        self,
+        n_years:int = 10,
+        rate:float = 6/100,
+        draws:int = 10_000,
+        uncertainty:Uncertainty|None = None,
+        seed:int|None = None,
+        workers:int|None = None,
+        )->MonteCarloResult:
+        """
+        NPV/IRR/payback distributions over weather years, operational losses,
+        tariff escalation, exchange rates and degradation; requires performance()
+        ... .summary() -> mean, P50 and P90 by metric
+        """
+        generators = self.components[self.generation_group_id]
+        yearly = sum(it.yearly_energy()['System_capacity_KW'].to_numpy() for it in generators)
+        investment = self.bucket.total().value
+        subtotal = self.bucket.subtotal().value
+        imported = sum(
+            it.cost.net(Currency.CLP)[0] for it in self.bucket.items
+            if it.cost is not None and it.cost.currency != Currency.CLP)
+
+        return monte_carlo(
+            income=self._performance['benefits'].sum()+self._performance['netbilling_income'].sum(),
+            investment=investment,
+            energy=self._performance['generation'].sum(),
+            yearly_energy=yearly,
+            losses=Photovoltaic.OPERATIONAL_LOSS,
+            escalation=self.building.consumptions['main'].get_cost_increment,
+            imported_share=imported/subtotal if subtotal else 0.0,
+            n_years=n_years,
+            rate=rate,
+            draws=draws,
+            uncertainty=uncertainty,
+            seed=seed,
+            workers=workers,
+            )
+
+    def sensitivity(
+        self,
+        variables:tuple[str,...]|None = None,
+        changes:tuple[float,...] = (-20,-10,0,10,20),
+        n_years:int = 10,
+        rate:float = 6/100,
+        consumptions:list[str]|None = None,
+        connection:Connection = 'netbilling',
+        settlement:Settlement|None = None,
+        profile:Profile|None = None,
+        )->DataFrame:
+        """
+        Financial sensitivity
+        ~~~~
+        one input changed at a time by percentage, all scenarios evaluated in one batch.
+        production is never recalculated: yield only scales generation before settlement,
+        cost and tariff changes only rescale cash flows.
+        >>> variables
+        ... capex: bucket subtotal (overloads follow it)
+        ... tariff: energy unit cost
+        ... escalation: cost increment rate
+        ... overloads: bucket overloads percentages
+        ... yield: generation
+        >>> DataFrame: variable, change [%], investment, income, npv, irr, payback, discounted_payback
+        ... models.financial tornado(table) and spider(table) summarize it
+        """
+        variables = variables or self.SENSITIVITY
+        unknown = [it for it in variables if it not in self.SENSITIVITY]
+        if unknown:
+            raise ValueError(f'unknown sensitivity variables {unknown}, use {self.SENSITIVITY}')
+
+        group = consumptions if consumptions else ['main']
+        settlement = settlement or self.settlement
+        future:DataFrame = self.building.consumption_forecast(group=group)
+        fare = self.building.consumptions[group[0]].fare
+
+        def income(scale:float)->float:
+            res = self._settle(future,group,connection,settlement,profile,scale)
+            return (res['savings']*res['unit_cost']).sum()\
+                + (res['netbilling']*fare.injection_price(res['unit_cost'])).sum()
+
+        subtotal = self.bucket.subtotal().value
+        overload = self.bucket.total().value-subtotal
+        increment = self.building.consumptions['main'].get_cost_increment-1
+        base_income = income(1.0)
+
+        rows = []
+        for variable in variables:
+            for change in changes:
+                factor = 1+change/100
+                rows.append({
+                    'variable':variable,
+                    'change':change,
+                    'investment':(subtotal+overload*(factor if variable == 'overloads' else 1))\
+                        *(factor if variable == 'capex' else 1),
+                    'income':base_income*factor if variable == 'tariff'\
+                        else income(factor) if variable == 'yield' else base_income,
+                    'escalation':1+increment*(factor if variable == 'escalation' else 1),
+                    })
+        table = DataFrame(rows)
+
+        flows = cash_flows(table['investment'],table['income'],n_years,table['escalation'])
+        result = evaluate(flows,rate)
+        return table.drop(columns='escalation').assign(
+            npv=result.npv,
+            irr=result.irr,
+            payback=result.payback,
+            discounted_payback=result.discounted_payback,
+            )
+
     def storage(self)->dict[str,float]|None:
         """storage capacity
         >>>result
@@ -455,9 +884,11 @@ class Project:
             "avg_demand_per_hour":f'{aux['hourly_avg_demand']:.2f} kWh',
         }
 
-    def context(self,template:DocxTemplate|None)->dict[str,Any]:
+    def context(self,template:DocxTemplate|None,session:ReportSession|None=None)->dict[str,Any]:
         #cspell: disable
-        "return object with information for generate DOCX template"
+        """return object with information for generate DOCX template,
+        session datasets are computed here if not given"""
+        session = session or ReportSession.build(self)
         #aux
         gmaps = RichText()
         if template is not None:
@@ -466,18 +897,16 @@ class Project:
                     bold=True,
                     underline=True)
         #demand projection
-        forecast:DataFrame = self.building.consumptions['main'].forecast()
-        base:DataFrame= self.building.consumptions['main'].to_dataframe()
+        forecast:DataFrame = session.forecast
+        base:DataFrame= session.base
 
         #production
-        performance  = self.performance(
-            consumptions=['main']
-            )
+        performance  = session.performance
         production_performance = performance[['month','consumption','generation','netbilling','savings']]
         #system capacity
         production_array = list(
             map(lambda it:f'{it['System_capacity_KW'].sum():.2f} kWh',
-                self.production_array()))
+                session.production_array))
 
 
         ctx:dict[str,any] = {
@@ -526,7 +955,7 @@ class Project:
                 'costo':it.cost.net(Currency.CLP)[0]})
             .to_markdown(index=True,floatfmt=',.0f'),
 
-            "table_energy_components":self.bucket.gx_bucket_df()\
+            "table_energy_components":session.budget[session.budget['glosa']=='generación']\
                 [['glosa','descripción','cantidad','global']]
                     .to_markdown(index=True),
             #production
@@ -539,11 +968,11 @@ class Project:
                             'savings':'ahorro',
                             }).round(2).to_markdown(index=False),
             #economics
-            "eco":self.economical_analysis(Currency.CLP,fmt=True),
-            "eco_num":self.economical_analysis(Currency.CLP,fmt=False),
+            "eco":session.eco,
+            "eco_num":session.eco_num,
             #energy storage unit
-            "storage_existance":True if self.storage() else False,
-            "storage_capacity":self.storage(),
+            "storage_existance":True if session.storage else False,
+            "storage_capacity":session.storage,
 
         }
         return ctx
@@ -567,19 +996,3 @@ class Project:
         Cost.set_exchange(Currency.EUR,currency_ratios['data']['EUR'])
         Cost.set_exchange(Currency.GBP,currency_ratios['data']['GBP'])
         Cost.set_exchange(Currency.BRL,currency_ratios['data']['BRL'])
-
-    def _ir(self,rate_cost:float,flux:list[float],method:Literal['simple','exact']='simple')-> float:
-        i = -flux[0]
-        b = flux[1]
-
-        if method == 'simple': #simple Inverstment Time Return
-            return i/b
-
-        if rate_cost == 0: #return simple ITR
-            return i/b
-
-        #find period when is positive flux
-        if method == 'exact':
-            return log((i*rate_cost/b)+1)/log(rate_cost+1)
-
-        return 0
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""hourly load shapes, expand monthly consumption into hourly energy"""
+from functools import lru_cache
+from typing import Literal
+import numpy as np
+from numpy import ndarray
+import pandas as pd
+from models.energy_storage import Regime, regime_mask
+
+type Profile = Literal['office','hospital','cesfam','school'] | Regime
+
+def _day(night:float,*blocks:tuple[int,int,float])->list[float]:
+    """24 hourly weights, night value out of blocks [start,end)"""
+    hours = [night]*24
+    for start,end,value in blocks:
+        hours[start:end] = [value]*(end-start)
+    return hours
+
+#relative hourly demand (weekday, saturday, sunday), hour 0 to 23
+LOAD_SHAPES:dict[str,tuple[list[float],list[float],list[float]]] = {
+    'office':(
+        _day(.25,(7,8,.5),(8,12,1.),(12,14,.9),(14,18,1.),(18,19,.6),(19,20,.4)),
+        _day(.3),
+        _day(.25),
+        ),
+    'hospital':(
+        _day(.7,(6,7,.8),(7,20,1.),(20,22,.9),(22,24,.8)),
+        _day(.7,(6,7,.75),(7,20,.95),(20,22,.85),(22,24,.75)),
+        _day(.7,(7,20,.9),(20,24,.8)),
+        ),
+    'cesfam':(#primary care, 8:00 to 20:00 weekdays and saturday morning extension
+        _day(.2,(7,8,.5),(8,20,1.),(20,21,.5)),
+        _day(.2,(8,9,.4),(9,13,.7),(13,14,.4)),
+        _day(.2),
+        ),
+    'school':(
+        _day(.15,(7,8,.5),(8,17,1.),(17,18,.6),(18,19,.3)),
+        _day(.15),
+        _day(.15),
+        ),
+    }
+
+def _weights(profile:Profile,dates:pd.DatetimeIndex)->ndarray:
+    """relative demand by hour"""
+    if profile in LOAD_SHAPES:
+        table = np.array(LOAD_SHAPES[profile]) #(3 day types, 24 hours)
+        day_type = np.clip(dates.dayofweek.to_numpy()-4,0,2) #mon-fri 0, sat 1, sun 2
+        return table[day_type,dates.hour.to_numpy()]
+    if isinstance(profile,str) and '/' in profile:
+        return regime_mask(dates,profile).astype(float)
+    raise ValueError(f'unknown load profile {profile}, use one of {[*LOAD_SHAPES]} or a regime')
+
+@lru_cache(maxsize=64)
+def load_shape(profile:Profile,year:int)->ndarray:
+    """
+    hourly fraction of monthly energy along a calendar year,
+    each month adds up 1, cached by (profile, year) and read only
+    """
+    dates = pd.date_range(f'{year}-01-01',f'{year}-12-31 23:00',freq='h')
+    weights = _weights(profile,dates)
+    month = dates.month.to_numpy()
+    totals = np.bincount(month,weights=weights,minlength=13)
+    shape = weights/totals[month]
+    shape.flags.writeable = False
+    return shape
+
+def hourly_load(
+    monthly_energy:ndarray,
+    profile:Profile = '24/7',
+    dates = None,
+    year:int|None = None,
+    )->ndarray:
+    """
+    hourly consumption synthesis
+    ~~~~
+    spread 12 monthly energy values (january first) over the hours of each month
+    following a load profile, every (year, month) in dates receives the whole month energy.
+    >>> args
+    ... monthly_energy: 12 values kWh
+    ... profile: load shape name or Regime string
+    ... dates: hourly stamps, eg weather dates, weekdays follow their own years
+    ... year: calendar year of the result when dates is None, required then
+    >>> return hourly energy kWh, one value per date
+    """
+    energy = np.asarray(monthly_energy,dtype=float)
+    if energy.shape != (12,):
+        raise ValueError('monthly energy must have 12 values')
+
+    if dates is None:
+        if year is None:
+            raise ValueError('year is required without dates')
+        dates = pd.date_range(f'{year}-01-01',f'{year}-12-31 23:00',freq='h')
+        return load_shape(profile,year)*energy[dates.month.to_numpy()-1]
+
+    stamps = pd.DatetimeIndex(dates)
+    years = stamps.year.to_numpy()
+    month = stamps.month.to_numpy()
+    position = (stamps.dayofyear.to_numpy()-1)*24+stamps.hour.to_numpy()
+
+    weights = np.empty(len(stamps))
+    for it in np.unique(years):
+        selection = years == it
+        weights[selection] = load_shape(profile,int(it))[position[selection]]
+
+    #normalize by (year, month) present in dates, missing hours don't lose energy
+    _,group = np.unique(years*100+month,return_inverse=True)
+    totals = np.bincount(group,weights=weights)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        share = np.where(totals[group] > 0,weights/totals[group],0.0)
+    return share*energy[month-1]
+
+# End-of-file (EOF)
@@ -0,0 +1,69 @@
+"""revision tracked memoization of the calculation chain"""
+from itertools import count
+from typing import Any, Callable, Hashable
+
+_TOKENS = count(1)
+
+class Revision:
+    """
+    input revision counter
+    ~~~~
+    inputs (weather, bucket, consumption, panels) call .touch() when they change,
+    calculations depending on them include (.token, .revision) in their memo key.
+    >>> token: process unique, assigned in __init__ and renewed on copy or unpickle,
+    ... so a memo key never matches another object, unlike id() of a freed one
+    """
+    revision:int = 0
+
+    def __init__(self) -> None:
+        self.token:int = next(_TOKENS)
+        self.revision = 0
+
+    def __setstate__(self,state:dict)->None:
+        self.__dict__.update(state)
+        self.token = next(_TOKENS)
+
+    def touch(self)->None:
+        """mark as changed"""
+        self.revision += 1
+
+class Memo:
+    """
+    Calculation graph memo
+    ~~~~
+    node values are stored with the key of their inputs and recomputed only when that key
+    changes. Keys are built from upstream keys, so a change re-runs every node downstream
+    of it and nothing else:
+    >>> weather -> irradiance -> capacity -> production -> performance -> finance
+    ... orientation or quantity of one panel group re-runs only that group capacity
+    ... overloads re-run only finance
+    >>> methods
+        ... .get(node,key,compute)->value
+        ... .key(node)->key|None
+        ... .clear(*nodes): all nodes if none given
+    """
+    def __init__(self) -> None:
+        self._store:dict[Hashable,tuple[Hashable,Any]] = {}
+
+    def get(self,node:Hashable,key:Hashable,compute:Callable[[],Any])->Any:
+        """stored value if key didn't change, else compute and store"""
+        stored = self._store.get(node)
+        if stored is not None and stored[0] == key:
+            return stored[1]
+        value = compute()
+        self._store[node] = (key,value)
+        return value
+
+    def key(self,node:Hashable)->Hashable|None:
+        """key of stored node value"""
+        stored = self._store.get(node)
+        return None if stored is None else stored[0]
+
+    def clear(self,*nodes:Hashable)->None:
+        """forget nodes values"""
+        if not nodes:
+            self._store.clear()
+        for it in nodes:
+            self._store.pop(it,None)
+
+# End-of-file (EOF)
@@ -1,14 +1,17 @@
 """photovoltaic model component"""
-from math import cos,sin,asin,acos,tan,radians,exp
+from math import cos,radians,exp
 from enum import Enum
 from dataclasses import dataclass
 import datetime
 import math
 from typing import Callable, Self
+import numpy as np
+from numpy import ndarray
 import pandas as pd
 from pandas import DataFrame, Series
 from models.generator import EnergyGenerator
-from models.geometry import GeoPosition, Orientation
+from models.geometry import GeoPosition, Orientation, SunPositionCache
+from models.memo import Memo, Revision
 from models.weather import Weather, WeatherParam as W
 from models.components import Component, Specs
 from models.econometrics import Cost, Currency
@@ -95,8 +98,9 @@ class Length(Enum):
 
 type Dimensions = tuple[float,float,Length]
 
-class PvTechnicalSheet:
-    "solar plane power technical specification"
+class PvTechnicalSheet(Revision):
+    """solar plane power technical specification,
+    assigning any attribute touches its revision (nested objects are not tracked)"""
     def __init__(self,
         brand:str='Generic',
         model:str='N/D',
@@ -109,6 +113,7 @@ class PvTechnicalSheet:
         ref_url:str=None,
         specs_url:str=None,
                 ) -> None:
+        super().__init__()
         self.power = power
         self.efficiency = efficiency
         self.power_curve = power_curve
@@ -135,6 +140,11 @@ class PvTechnicalSheet:
         if isinstance(area,tuple):
             self.area = area[0]*area[1]/(area[2].value*area[2].value)
 
+    def __setattr__(self,name:str,value)->None:
+        super().__setattr__(name,value)
+        if name not in ('token','revision'):
+            self.touch()
+
 class CostModel(Enum):
     """model of cost calculation Lambda"""
     #PV COST MODEL, includes price clp per watt,
@@ -146,7 +156,7 @@ class CostModel(Enum):
     #PV linear COST MODEL,
     # includes price clp per watt,just panel.
     LINEAR:Callable[[float],float] = lambda size_w: 245990/655
-class Photovoltaic(EnergyGenerator):
+class Photovoltaic(EnergyGenerator,Revision):
     """
     PV primary component
     ~~~~
@@ -163,11 +173,23 @@ class Photovoltaic(EnergyGenerator):
     ... .calc_irradiation() -> al irradiation received by an inclined surface.
     ... .calc_reflection() -> IAM reflection losses coefficient.
     ... .calc_energy() -> calc al lost, and irradiation performance to a nominal panel.
+    ... .sweep_orientation() -> annual energy over a grid of inclinations and azimuths.
+    ... .yearly_energy() -> annual energy for each weather year.
+    ... .exceedance() -> P50/P90 annual energy over weather years.
 
     """
-    energy:DataFrame = pd.DataFrame()
     PARAMS:list[W] = [W.TEMPERATURE,W.DIRECT,W.DIFFUSE,W.ALBEDO,W.ZENITH,W.WIND_SPEED_10M]
-    _system_capacity:DataFrame|None = None
+    SWEEP_CHUNK:int = 256 #orientations evaluated per batch
+    OPERATIONAL_LOSS:dict[str,float] = {
+        'dirt':0.02,
+        'shadows':0.03,
+        'imperfections':0.02,
+        'wiring':0.02,
+        'connectors':0.005,
+        'degradation':0.015,
+        'off_timer':0.03,
+        'lab_error':0.01,
+        }
 
     def __init__(
         self,
@@ -195,16 +217,15 @@ class Photovoltaic(EnergyGenerator):
             specification=specification,
             cost_per_unit=aux_cost,
             quantity=quantity)
-        
+        Revision.__init__(self)
+
         self.orientation = orientation
         self.technical_sheet = technical_sheet
         self._weather = weather
+        #irradiance and capacity memo, recomputed on orientation, quantity or weather changes
+        self._memo = Memo()
         #init weather values
-        self._weather.parameters =self.PARAMS
-        weather_date = weather.get_data()
-        #calc reusable cos_phi
-        self._cos_phi:DataFrame = weather_date['date']\
-            .apply(lambda date:self._calc_cos_phi(date=date,location=weather.geo_position))
+        weather.require(['date',*self.PARAMS])
 
 
     def set_cost(self,cost:Cost):
@@ -219,15 +240,32 @@ class Photovoltaic(EnergyGenerator):
         """elevation and azimuth surface´s normal"""
         return {'azimuth':self.orientation.inclination,'elevation':self.orientation.inclination}
 
-    def _calc_cos_phi(self,date:datetime,location:GeoPosition)->float:
-        """or angle between sun and normal or surface"""
-        sun= location.sun_position(date)
+    def _irradiance_key(self)->tuple:
+        """inputs of irradiance on plane"""
+        return (self._weather.token,self._weather.revision,self.orientation.inclination,self.orientation.azimuth)
+
+    def energy_key(self)->tuple:
+        """inputs of energy production, changes when production must be recalculated"""
+        sheet = self.technical_sheet
+        return (self.token,*self._irradiance_key(),self.quantity,sheet.token,sheet.revision)
+
+    @property
+    def _cos_phi(self)->Series:
+        """reusable cos_phi of this orientation"""
+        return self._memo.get('cos_phi',self._irradiance_key(),lambda:self._calc_cos_phi(
+            dates=self._weather.get_column('date'),
+            location=self._weather.geo_position))
+
+    def _calc_cos_phi(self,dates:Series,location:GeoPosition)->Series:
+        """or angle between sun and normal or surface, for all dates in one pass,
+        sun position is shared by all panels on same site"""
+        sun = SunPositionCache.get(location,dates)
 
         cos_phi = self.orientation.cos_phi(
             sun_azimuth=sun['azimuth'],
             sun_elevation=sun['elevation'])
 
-        return cos_phi
+        return pd.Series(cos_phi,index=dates.index)
 
     def _calc_irradiation(self)->DataFrame:
         """calc irradiation on plane, direct,diffuse, ground and global on plane w/m^2 """
@@ -259,7 +297,7 @@ class Photovoltaic(EnergyGenerator):
 
         return irr
 
-    def _calc_reflection(self)->Series:
+    def _calc_reflection(self,cos_phi:ndarray|None=None)->Series|ndarray:
         '''
         reflection Module
         ~~~~
@@ -271,45 +309,45 @@ class Photovoltaic(EnergyGenerator):
         ... The reflected amount depends on the material
         ... of the cover and its thickness.
 
+        computed over whole arrays, cos_phi of any shape (default: this panel cos_phi)
+
         Ref:
         >>> https://solar.minenergia.cl/downloads/fotovoltaico.pdf#page=6
         '''
-        reflex = pd.DataFrame()
-
         surface_reflex=1.526
         air_reflex= 1
         glass_extinction = 4 # [1/m]
         thickness = 0.002 #[m] 2 mm
 
+        angle = self._cos_phi.to_numpy(dtype=float) if cos_phi is None else np.asarray(cos_phi,dtype=float)
+
         #get angular
-        reflex['phi']:DataFrame = self._cos_phi.apply(acos) # type: ignore
-        reflex['phi_r']:DataFrame = reflex['phi'].apply(\
-            lambda phi:asin(sin(phi)*(air_reflex/surface_reflex)\
-                ))
-        # print(reflex)
-
-        #transmittance
-        def _tau_reflex(row:DataFrame)->float:
-            #extract from row
-            phi = row['phi']
-            phi_r = row['phi_r']
-            #calc transmittance on surface
-            tau =  exp(-1* glass_extinction*thickness/(cos(phi_r)))*\
-            (1 -0.5*(\
-                (sin(phi_r-phi)**2 / sin(phi_r+phi)**2) +\
-                (tan(phi_r-phi)**2 / tan(phi_r+phi)**2) \
-                    ))
-            #values close to ZERO, turn into cero
-            return tau if tau>0.001 else 0
-        #transmittance on phi == 0°
-        tau_zero:float = exp(-1*glass_extinction*thickness)*\
-                (1-((1-surface_reflex)/(1+surface_reflex))**2)
+        phi = np.arccos(np.clip(angle,0,1))
+        phi_r = np.arcsin(np.sin(phi)*(air_reflex/surface_reflex))
+
+        #reflectance on phi == 0°, limit of fresnel equations
+        reflex_zero:float = ((air_reflex-surface_reflex)/(air_reflex+surface_reflex))**2
+        #sin(phi_r+phi) is zero on normal incidence
+        normal = np.sin(phi_r+phi) < 1e-9
+
+        #transmittance on surface
+        with np.errstate(divide='ignore',invalid='ignore'):
+            reflex = 0.5*(\
+                (np.sin(phi_r-phi)**2 / np.sin(phi_r+phi)**2) +\
+                (np.tan(phi_r-phi)**2 / np.tan(phi_r+phi)**2))
+        reflex = np.where(normal,reflex_zero,reflex)
+        tau = np.exp(-1*glass_extinction*thickness/np.cos(phi_r))*(1-reflex)
+        #values close to ZERO, turn into cero
+        tau = np.where(tau>0.001,tau,0)
 
-        transmittance_reflex = reflex.apply(_tau_reflex,axis=1)
+        #transmittance on phi == 0°
+        tau_zero:float = exp(-1*glass_extinction*thickness)*(1-reflex_zero)
 
         #IAM
-        iam = transmittance_reflex/tau_zero
+        iam = tau/tau_zero
 
+        if cos_phi is None:
+            return pd.Series(iam,index=self._cos_phi.index)
         return iam
 
     def _calc_temperature_cell(self,irradiance:DataFrame,coef:TempCoef=TempCoef.ROOF_MOUNT)->Series:
@@ -321,104 +359,203 @@ class Photovoltaic(EnergyGenerator):
         based in PVWatts model DOBOS,2014 used by NREL
         ref: https://solar.minenergia.cl/downloads/fotovoltaico.pdf#page=8
         """
-        #calc panel over irradiation result
         weather_data =  self._weather.get_data()
-        irradiance[W.WIND_SPEED_10M.value] = weather_data[W.WIND_SPEED_10M.value]
-        #coefficient temperature
-        #alpha = self.technical_sheet.thermal.short_circuit_t
-        #beta = self.technical_sheet.thermal.open_circuit_t
-        alpha = coef.value['alpha']
-        beta = coef.value['beta']
-        delta = coef.value['deltaT']
-
-        #aux function
-        def _temperature_panel(row):
-            return row[PvParam.INCIDENT.value]*exp(alpha+\
-                beta*row[W.WIND_SPEED_10M.value])
-
-        def _temperature_cell(row):
-            return _temperature_panel(row) + row[PvParam.INCIDENT.value]*delta/1000
+        t_cell,_ = self._pvwatts_kernel(
+            incident=irradiance[PvParam.INCIDENT.value].to_numpy(dtype=float),
+            wind=weather_data[W.WIND_SPEED_10M.value].to_numpy(dtype=float),
+            coef=coef)
 
-        t_cell_result = irradiance.apply(_temperature_cell,axis=1)
-        return t_cell_result
+        return pd.Series(t_cell,index=irradiance.index)
 
     def _operational_loss(self)->float:
         '''
         Total losses for operational causes
         '''
-        model_loss = {
-            'dirt':0.02,
-            'shadows':0.03,
-            'imperfections':0.02,
-            'wiring':0.02,
-            'connectors':0.005,
-            'degradation':0.015,
-            'off_timer':0.03,
-            'lab_error':0.01,
-        }
-
-        total_loss = 0
-        for _,loss in model_loss.items():
-            total_loss += loss
-        return total_loss
+        return sum(self.OPERATIONAL_LOSS.values())
 
 
-    def _calc_system_capacity(self,irradiation:DataFrame)->DataFrame:
+    def _pvwatts_kernel(
+        self,
+        incident:ndarray,
+        wind:ndarray,
+        coef:TempCoef=TempCoef.ROOF_MOUNT,
+        )->tuple[ndarray,ndarray]:
         """
-        System capacity Global [W]
+        PVWatts thermal and capacity kernel
         ~~~~
+        cell temperature [°C] and system capacity [kW] in one pass,
+        from incident irradiance [W/m2] and wind speed [m/s] arrays
+        of any broadcastable shape.
+        ref https://pvwatts.nrel.gov/downloads/pvwattsv5.pdf#page=9
+        ref https://solar.minenergia.cl/downloads/fotovoltaico.pdf#page=8
         """
         #capacity under lab conditions AREA*QUANTITY*Ef
         # nominal_capacity:float = self.technical_sheet.area * self.quantity * self.technical_sheet.efficiency #0.18 w/m2
         nominal_capacity:float = self.technical_sheet.power * self.quantity/1000 #0.21 w/m2
 
+        #coefficient temperature
+        alpha = coef.value['alpha']
+        beta = coef.value['beta']
+        delta = coef.value['deltaT']
+
+        #cell temperature
+        t_cell = incident*np.exp(alpha+beta*wind) + incident*delta/1000
+
         #temperature performance
-        t_cel:Series = self._calc_temperature_cell(irradiation)
         t_ref:float = 25.5 #C°
         gamma:float = self.technical_sheet.thermal.power_coef_t/100# %/C°
-        irr_incident:Series = irradiation[PvParam.INCIDENT.value]
+        gamma_factor = 1+gamma*(t_cell-t_ref)
         DOBO_LIMIT = 125.0#W/m^2
         ref_irr = 1000#W/m^2
 
-        #init calc system capacity
-        system_capacity:DataFrame = pd.DataFrame()
-        system_capacity[PvParam.T_CELL.value] = t_cel #°C
-        system_capacity[PvParam.INCIDENT.value] = irr_incident #w/m^2
-        ##print(system_capacity.info())
-
-
-        #system capacity in w/m^2
-        def calc_capacity(row)->DataFrame:
-            #ref https://pvwatts.nrel.gov/downloads/pvwattsv5.pdf#page=9
-            # https://solar.minenergia.cl/downloads/fotovoltaico.pdf#page=8
-            #data extract
-            incident,t_cell = row[PvParam.INCIDENT.value],row[PvParam.T_CELL.value]
-            gamma_factor:float = (1+gamma*(t_cell-t_ref))
-
-            if incident>= DOBO_LIMIT:
-                return (incident/ref_irr) * nominal_capacity * gamma_factor
-
-
-            return 0.008 * (incident**2 / ref_irr) * nominal_capacity * gamma_factor
-
-        system_capacity[PvParam.SYS_CAP.value] = system_capacity.apply(calc_capacity,axis=1)
+        #system capacity in kW, low irradiance branch under DOBO limit
+        capacity = np.where(
+            incident>=DOBO_LIMIT,
+            incident/ref_irr,
+            0.008 * incident**2/ref_irr,
+            ) * nominal_capacity * gamma_factor
 
         #operational losses
         inverter_efficiency = 0.96
         op_loss = self._operational_loss()
 
+        return t_cell, capacity*inverter_efficiency*(1-op_loss)
+
+    def _calc_system_capacity(self,irradiation:DataFrame)->DataFrame:
+        """
+        System capacity Global [W]
+        ~~~~
+        """
+        weather_data = self._weather.get_data()
+        irr_incident:Series = irradiation[PvParam.INCIDENT.value]
+
+        t_cell,capacity = self._pvwatts_kernel(
+            incident=irr_incident.to_numpy(dtype=float),
+            wind=weather_data[W.WIND_SPEED_10M.value].to_numpy(dtype=float),
+            )
+
         #SYSTEM GLOBAL CAPACITY * UNIT AREA * QUANTITY UNITS
-        system_capacity[PvParam.SYS_CAP.value] = system_capacity[PvParam.SYS_CAP.value]\
-            .apply(lambda cap: cap *inverter_efficiency* (1-op_loss))
+        system_capacity:DataFrame = pd.DataFrame({
+            PvParam.T_CELL.value:t_cell,#°C
+            PvParam.INCIDENT.value:irr_incident, #w/m^2
+            PvParam.SYS_CAP.value:capacity,#kW
+            },index=irradiation.index)
 
         return system_capacity
 
+    def _incident_irradiance(
+        self,
+        weather_data:DataFrame,
+        cos_phi:ndarray,
+        inclination:float|ndarray,
+        )->ndarray:
+        """global incident irradiance on plane w/m^2 as array,
+        cos_phi rows broadcast against weather hours"""
+        direct = weather_data[W.DIRECT.value].to_numpy(dtype=float)
+        diffuse = weather_data[W.DIFFUSE.value].to_numpy(dtype=float)
+        albedo = weather_data[W.ALBEDO.value].to_numpy(dtype=float)
+        cos_b = 1+np.cos(np.radians(inclination))
+
+        return direct*cos_phi*self._calc_reflection(cos_phi)\
+            + direct*0.5*albedo*cos_b\
+            + diffuse*0.5*cos_b
+
+    def sweep_orientation(
+        self,
+        inclinations:list[float]|ndarray = range(0,61,5),
+        azimuths:list[float]|ndarray = range(-90,91,5),
+        )->tuple[DataFrame,dict[str,float]]:
+        """
+        Orientation sweep
+        ~~~~
+        annual energy [kWh] of this panel group over a grid of inclinations x azimuths,
+        batched against stored sun position and weather, without new Photovoltaic instances.
+        >>> result
+        ... heatmap: DataFrame index=inclination, columns=azimuth, values kWh/year
+        ... optimum: {inclination, azimuth, energy}
+        """
+        weather_data = self._weather.get_data()
+        sun = SunPositionCache.get(self._weather.geo_position,weather_data['date'])
+        wind = weather_data[W.WIND_SPEED_10M.value].to_numpy(dtype=float)
+
+        grid_inclination,grid_azimuth = np.meshgrid(
+            np.asarray(inclinations,dtype=float),
+            np.asarray(azimuths,dtype=float),
+            indexing='ij')
+        inclination = grid_inclination.reshape(-1,1)
+        azimuth = grid_azimuth.reshape(-1,1)
+
+        energy = np.empty(inclination.shape[0])
+        for start in range(0,energy.size,self.SWEEP_CHUNK):
+            chunk = slice(start,start+self.SWEEP_CHUNK)
+            #orientations x hours
+            cos_phi = Orientation(inclination[chunk],azimuth[chunk])\
+                .cos_phi(sun_azimuth=sun['azimuth'],sun_elevation=sun['elevation'])
+            incident = self._incident_irradiance(weather_data,cos_phi,inclination[chunk])
+            _,capacity = self._pvwatts_kernel(incident=incident,wind=wind)
+            energy[chunk] = np.nansum(capacity,axis=1)
+
+        heatmap = DataFrame(
+            energy.reshape(grid_inclination.shape),
+            index=pd.Index(grid_inclination[:,0],name='inclination'),
+            columns=pd.Index(grid_azimuth[0,:],name='azimuth'))
+
+        best = int(np.argmax(energy))
+        optimum = {
+            'inclination':float(inclination[best,0]),
+            'azimuth':float(azimuth[best,0]),
+            'energy':float(energy[best]),
+            }
+
+        return heatmap,optimum
+
+    def yearly_energy(self)->DataFrame:
+        """
+        Multi-year production
+        ~~~~
+        annual energy [kWh] for each weather year (Weather.years),
+        computed in one vectorized pass over a (years x hours) array.
+        >>> DataFrame Structure
+        - year: int
+        - System_capacity_KW: float [kWh/year]
+        """
+        weather_data = self._weather.get_years()
+        years = weather_data['year'].unique()
+        hours = self._weather.HOURS
+
+        sun = SunPositionCache.get(self._weather.geo_position,weather_data['date'])
+        cos_phi = self.orientation.cos_phi(
+            sun_azimuth=sun['azimuth'],
+            sun_elevation=sun['elevation'])
+        incident = self._incident_irradiance(weather_data,cos_phi,self.orientation.inclination)
+        wind = weather_data[W.WIND_SPEED_10M.value].to_numpy(dtype=float)
+        _,capacity = self._pvwatts_kernel(
+            incident=incident.reshape(len(years),hours),
+            wind=wind.reshape(len(years),hours))
+
+        return DataFrame({
+            'year':years.astype(int),
+            PvParam.SYS_CAP.value:np.nansum(capacity,axis=1),
+            })
+
+    def exceedance(self,levels:tuple[int,...]=(50,90))->dict[str,float]:
+        """
+        annual energy [kWh] exceeded with given probability over weather years,
+        ... P50: median year, P90: exceeded 9 of 10 years
+        """
+        return exceedance(self.yearly_energy()[PvParam.SYS_CAP.value].to_numpy(),levels)
+
     def nominal_power(self)->float:
         """
         power in kW = 1000 Watt
         """
         return self.technical_sheet.power * self.quantity/1000
 
+    @property
+    def energy(self)->DataFrame:
+        """hourly generation, as get_energy()"""
+        return self.get_energy()
+
     def get_energy(self) -> DataFrame:
         """
         Module Energy Calc
@@ -436,19 +573,16 @@ class Photovoltaic(EnergyGenerator):
         - Temperature_cell: float [°C]
         - IRR_incident: float [kW/m2]
         """
-        #use stored value
-        if self._system_capacity is not None:
-            return self._system_capacity
+        return self._memo.get('capacity',self.energy_key(),self._calc_energy)
 
+    def _calc_energy(self)->DataFrame:
+        """hourly energy production, from stored irradiance if orientation didn't change"""
         #fetch nasa weather data
         weather_data = self._weather.get_data()
 
-        #tempo init values for energy
-        self.energy[['date','month','day','hour']] = weather_data[['date','month','day','hour']]
-
 
         #calc irradiation factors
-        irradiation:DataFrame =self._calc_irradiation()#w/m^2
+        irradiation:DataFrame = self._memo.get('irradiance',self._irradiance_key(),self._calc_irradiation)#w/m^2
         ##print(irradiation.info())
 
         #calc system_capacity in KW
@@ -461,12 +595,15 @@ class Photovoltaic(EnergyGenerator):
         system_capacity=system_capacity.rename(columns={'date':'date UTC'})
 
         ##print(system_capacity.info())
-        self._system_capacity = system_capacity
-
         return system_capacity
-    
+
     def __add__(self, other):
         pass
+
+def exceedance(energy:ndarray,levels:tuple[int,...]=(50,90))->dict[str,float]:
+    """Pxx values from yearly energy samples, Pxx is exceeded xx% of years"""
+    return {f'P{level}':float(np.percentile(energy,100-level)) for level in levels}
+
 @dataclass
 class PvFactory:
     """modular adapter for Repository reusability"""
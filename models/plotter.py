@@ -1,34 +1,51 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+import hashlib
+import json
 import os
+from types import CodeType
+from typing import Any, Callable, Iterable, Iterator, Literal, Mapping
 import folium
-from matplotlib import pyplot as plt
+from matplotlib import colormaps
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
-from pandas import DataFrame,ExcelWriter
-from html2image import Html2Image
+from openpyxl import Workbook
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from pandas import DataFrame, DatetimeTZDtype
+from pandas.util import hash_pandas_object
 from docxtpl import DocxTemplate
 from models.bucket import BucketItem
 from models.econometrics import Currency
+from models.financial import spider, tornado
 from models.inventory import Project
+from models.static_map import render_map
+from models.report import ReportSession
 #cspell: disable
 
-def generate_docs(project):
-    """doct generator fun wrapper"""
+PLOT_HASHES:str = 'plot_hashes.json' #figure inputs digest by name, inside report path
+PLOT_VERSION:int = 1 #part of every figure digest, increase when shared drawing helpers change
+EXPORT_CHUNK:int = 2000 #rows streamed at once into excel
+MAX_LABELS:int = 24 #value labels by plotted series
+HOURLY_TABLES:tuple[str,...] = ('clima','capacidad')
+
+type Sidecar = Literal['csv.gz','parquet']
+
+def generate_docs(project,plot_workers:int|None=None,sidecar:Sidecar|None=None):
+    """doct generator fun wrapper, plot_workers as plotter workers, sidecar as to_table"""
     #path
     path = get_path(project)
 
-    #generate tables and store CSV
-    to_table(project,path)
-
-    #generate plots and store PNG
-    plotter(project,path)
+    #derived datasets computed once for tables, plots and both templates
+    session = ReportSession.build(project)
 
-    #load templates
-    memory_report = DocxTemplate("templates/memory_template.docx")
-    bidding_report = DocxTemplate("templates/bidding_template.docx")
+    #generate tables and store XLSX
+    to_table(project,path,session,sidecar)
 
-    #fill with context
-    memory_report.render(project.context(template=memory_report))
-    bidding_report.render(project.context(template=bidding_report))
+    #generate plots and store PNG
+    plotter(project,path,workers=plot_workers,session=session)
 
     #fill with graph
     #set into doc
@@ -44,19 +61,32 @@ def generate_docs(project):
         'plot_flux',
         'map_location'
     ]
-
-    for plot in plot_list:
-        memory_report.replace_pic(plot,path+f'{plot}.png')
-        print('replaced plot:',plot)
-
+    pictures = {plot:path+f'{plot}.png' for plot in plot_list}
     #set scketch connection_diagram
-    memory_report.replace_pic('connection_diagram',f'templates/diagram_{project.connection_type}.png')
+    pictures['connection_diagram'] = f'templates/diagram_{project.connection_type}.png'
 
-    #save docs
-    memory_report.save(path+"reporte_memoria_calculo.docx")
-    bidding_report.save(path+"reporte_pliegos_técnicos.docx")
+    #load templates, fill with context and save docs
+    render_template(project,session,
+                    "templates/memory_template.docx",path+"reporte_memoria_calculo.docx",pictures)
+    render_template(project,session,
+                    "templates/bidding_template.docx",path+"reporte_pliegos_técnicos.docx")
     print('work',project,'finish at: ',datetime.now())
 
+def render_template(
+    project:Project,
+    session:ReportSession,
+    template_path:str,
+    output_path:str,
+    pictures:dict[str,str]|None=None,
+    )->None:
+    """fill a DOCX template with project context and replace its pictures"""
+    report = DocxTemplate(template_path)
+    report.render(project.context(template=report,session=session))
+    for name,picture in (pictures or {}).items():
+        report.replace_pic(name,picture)
+        print('replaced plot:',name)
+    report.save(output_path)
+
 def get_path(project:Project)->str:
     """get path name, and if not exists create it"""
     path = 'build/'+f'r_{project.building.city.lower()[:3]}_{project.building.name}/'
@@ -72,105 +102,257 @@ def create_path_if_not_exist(path:str):
 
 def to_table(
     project:Project,
-    path:str
+    path:str,
+    session:ReportSession|None = None,
+    sidecar:Sidecar|None = None,
     )->None:
-    """generate excel results"""
+    """
+    generate excel results
+    ~~~~
+    one workbook with a sheet by dataset, rows streamed through a write only
+    workbook so cells are never kept formatted in memory.
+    >>> sidecar: also store hourly datasets (clima, capacidad) as csv.gz or parquet
+    """
+    session = session or ReportSession.build(project)
     data_to_file:dict[str,DataFrame] = {
-        'clima':project.weather.get_data(),
-        'capacidad':project.energy_production(),
-        'performance':project.performance(consumptions=['main']),
-        'presupuesto':project.bucket.bucket_df()
+        'clima':session.weather,
+        'capacidad':session.production,
+        'performance':session.performance,
+        'presupuesto':session.budget,
     }
+    name = f'calc_{project.building.city}_{project.building.name}'
 
-    #create path
-
+    workbook = Workbook(write_only=True)
     for key,data in data_to_file.items():
-        with ExcelWriter(path+f'calc_{project.building.city}_{project.building.name}_{key}.xlsx') as writer:#pylint: disable=abstract-class-instantiated
-            data.to_excel(writer,sheet_name='result')
-
-def plotter(project:Project,path:str)->None:
-    """plot all"""
-    #aux
-    f=project.building.consumptions['main'].forecast()
-    w = project.weather.get_data()
-    #plotting
-    plot_consumption_forecast(f,path)
-    plot_irradiance(w,path)
-    plot_temperature(w,path)
-    plot_components(project,path)
-    plot_components_irr(project,path)
-    plot_components_production(project,path)
-    plot_production_performance(project,path)
-    plot_performance_frecuency(project,path)
-    plot_flux(project,path)
+        write_sheet(workbook.create_sheet(key),data)
+        if sidecar is not None and key in HOURLY_TABLES:
+            if sidecar == 'parquet':
+                data.to_parquet(path+f'{name}_{key}.parquet')
+            else:
+                data.to_csv(path+f'{name}_{key}.csv.gz',compression='gzip')
+    workbook.save(path+f'{name}.xlsx')
+
+def write_sheet(sheet:WriteOnlyWorksheet,data:DataFrame,chunk:int=EXPORT_CHUNK)->None:
+    """append frame to a write only sheet in chunks of rows, index first as DataFrame.to_excel"""
+    sheet.append(['' if data.index.name is None else data.index.name,*map(str,data.columns)])
+    for start in range(0,len(data),chunk):
+        part = data.iloc[start:start+chunk].reset_index()
+        for column in part.columns:
+            if isinstance(part[column].dtype,DatetimeTZDtype):
+                #excel has no time zones
+                part[column] = part[column].dt.tz_localize(None)
+        part = part.astype(object).where(part.notna(),None)
+        for row in part.itertuples(index=False,name=None):
+            sheet.append(row)
+
+def plotter(
+    project:Project,
+    path:str,
+    workers:int|None=None,
+    force:bool=False,
+    session:ReportSession|None=None,
+    )->None:
+    """
+    plot all
+    ~~~~
+    figure inputs are gathered from project, then every figure is rendered with the
+    object oriented Agg API in a process pool. Figures whose inputs hash didn't change
+    since last run (stored in PLOT_HASHES inside path) are skipped unless force,
+    a render returning False (eg: map with missing tiles) is not stored so it runs again.
+    >>> workers: process pool size, None cpu count, 1 renders in process
+    """
+    jobs = plot_jobs(project,session)
+    hashes_path = path+PLOT_HASHES
+    hashes:dict[str,str] = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path,encoding='utf-8') as file:
+            hashes = json.load(file)
+
+    pending:dict[str,tuple[Callable,tuple]] = {}
+    digests:dict[str,str] = {}
+    for name,(render,args) in jobs.items():
+        digests[name] = plot_digest(render,args)
+        if not force and hashes.get(name) == digests[name] and os.path.exists(path+name+'.png'):
+            print('unchanged plot:',name)
+            continue
+        pending[name] = (render,args)
+
+    workers = min(workers or os.cpu_count() or 1,len(pending))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name:pool.submit(render,path+name+'.png',*args) for name,(render,args) in pending.items()}
+            for name,future in futures.items():
+                if future.result() is not False:
+                    hashes[name] = digests[name]
+    else:
+        for name,(render,args) in pending.items():
+            if render(path+name+'.png',*args) is not False:
+                hashes[name] = digests[name]
+
+    with open(hashes_path,'w',encoding='utf-8') as file:
+        json.dump(hashes,file,indent=2)
+
+    #interactive map along the static one
     plot_map(project,path)
-    map_to_image(path)
 
     print('plot_done')
 
+def plot_jobs(
+    project:Project,
+    session:ReportSession|None=None,
+    names:Iterable[str]|None=None,
+    )->dict[str,tuple[Callable,tuple]]:
+    """
+    figure name -> (render function, picklable inputs), in report order
+    >>> names: only these figures, without session only their datasets are computed
+    """
+    if session is None and names is None:
+        session = ReportSession.build(project)
+
+    def data(name:str):
+        return getattr(session,name) if session is not None else ReportSession.compute(project,name)
 
-def plot_consumption_forecast(forecast:DataFrame,path:str):
+    geo = project.building.geolocation
+    jobs:dict[str,Callable[[],tuple[Callable,tuple]]] = {
+        'plot_consumption_forecast':lambda:(render_consumption_forecast,(data('forecast')[['month','energy']],)),
+        'plot_irradiance':lambda:(render_irradiance,(
+            data('weather')[['month','day','ALLSKY_SFC_SW_DNI','ALLSKY_SFC_SW_DIFF']],)),
+        'plot_temperature':lambda:(render_temperature,(data('weather')[['month','day','T2M']],)),
+        'plot_components':lambda:(render_components,(components_table(project),)),
+        'plot_components_irr':lambda:(render_components_irr,([
+            module.fillna(0).pivot_table(index='month',columns='hour',values='IRR_incident')
+            for module in data('production_array')],)),
+        'plot_components_production':lambda:(render_components_production,([
+            module[['month','day','System_capacity_KW']].groupby(['month'],as_index=False).sum()
+            for module in data('production_array')],)),
+        'plot_production_performance':lambda:(render_production_performance,(
+            data('performance')[['month','consumption','generation','netbilling','savings']],)),
+        'plot_performance_frequency':lambda:(render_performance_frequency,(
+            data('production')[['hour','System_capacity_KW']],)),
+        'plot_flux':lambda:(render_flux,(flux_table(data('eco_num')),)),
+        'map_location':lambda:(render_map,(geo.latitude,geo.longitude)),
+        }
+    names = jobs.keys() if names is None else names
+    return {name:jobs[name]() for name in jobs if name in names}
+
+def _update_code(digest,code:CodeType)->None:
+    """bytecode, names and constants of a function, nested functions included"""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const,CodeType):
+            _update_code(digest,const)
+        elif isinstance(const,frozenset):
+            #set order changes between processes
+            digest.update(repr(sorted(map(repr,const))).encode())
+        else:
+            digest.update(repr(const).encode())
+
+def plot_digest(render:Callable,args:tuple)->str:
+    """sha256 of PLOT_VERSION, render function code and its inputs content,
+    a renderer edit redraws its figure, shared helpers edits need a PLOT_VERSION increase"""
+    digest = hashlib.sha256(f'{PLOT_VERSION}:{render.__module__}.{render.__qualname__}'.encode())
+    _update_code(digest,render.__code__)
+
+    def _update(value)->None:
+        if isinstance(value,(list,tuple)):
+            for it in value:
+                _update(it)
+        elif isinstance(value,DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+            digest.update(hash_pandas_object(value,index=True).values.tobytes())
+        elif isinstance(value,np.ndarray):
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode())
+
+    _update(args)
+    return digest.hexdigest()
+
+@contextmanager
+def _figure(file:str,dpi:int=300,**kwargs)->Iterator[Figure]:
+    """Agg figure outside pyplot state, saved to file and closed on exit"""
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    try:
+        yield fig
+        fig.savefig(file,dpi=dpi)
+    finally:
+        fig.clear()
+
+def _point_labels(ax:Axes,x,y,labels,max_labels:int=MAX_LABELS,**kwargs)->None:
+    """
+    value labels over the points inside the axes view, call after every series is plotted;
+    longer series get max_labels evenly spaced labels, so artists don't grow with points
+    """
+    x,y = np.asarray(x,dtype=float),np.asarray(y,dtype=float)
+    labels = np.asarray(labels,dtype=object)
+    ax.autoscale_view()
+    (x0,x1),(y0,y1) = sorted(ax.get_xlim()),sorted(ax.get_ylim())
+    shown = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+    if shown.size > max_labels:
+        shown = shown[np.linspace(0,shown.size-1,max_labels).round().astype(int)]
+    for i in shown:
+        ax.text(x[i],y[i],labels[i],ha='center',va='bottom',**kwargs)
+
+def render_consumption_forecast(file:str,forecast:DataFrame)->None:
     """consumption forecast line plot"""
-    p = plt.subplot()
-    p.plot(forecast['month'],forecast['energy'],linewidth=3)
-    p.set_xlabel('mes')
-    p.set_ylabel('consumo [kWH]')
-    plt.savefig(path+'plot_consumption_forecast'+'.png',dpi=300)
+    with _figure(file) as fig:
+        p = fig.add_subplot()
+        p.plot(forecast['month'],forecast['energy'],linewidth=3)
+        p.set_xlabel('mes')
+        p.set_ylabel('consumo [kWH]')
 
-def plot_irradiance(weather:DataFrame,path:str):
+def render_irradiance(file:str,weather:DataFrame)->None:
     """irradiance plot saving"""
-    plt.figure(figsize=(10,4))
-    p = plt.subplot()
-    w = weather
-    g= w[['month','day','ALLSKY_SFC_SW_DNI','ALLSKY_SFC_SW_DIFF']]\
-        .groupby(['month','day'],as_index=False).mean()
-    p.plot(
-        g.index.values,
-        g['ALLSKY_SFC_SW_DNI'].values,
-        label='directa',
-        linewidth=.75
-        )
-    p.plot(
-        g.index.values,
-        g['ALLSKY_SFC_SW_DIFF'].values,
-        label='difusa',
-        linewidth=.75
-        )
-    p.set_xlabel('dia N')
-    p.set_ylabel('irradiación media por día W/m2')
-    plt.legend()
-    plt.savefig(path+'plot_irradiance'+'.png',dpi=350)
+    with _figure(file,dpi=350,figsize=(10,4)) as fig:
+        p = fig.add_subplot()
+        g= weather[['month','day','ALLSKY_SFC_SW_DNI','ALLSKY_SFC_SW_DIFF']]\
+            .groupby(['month','day'],as_index=False).mean()
+        p.plot(
+            g.index.values,
+            g['ALLSKY_SFC_SW_DNI'].values,
+            label='directa',
+            linewidth=.75
+            )
+        p.plot(
+            g.index.values,
+            g['ALLSKY_SFC_SW_DIFF'].values,
+            label='difusa',
+            linewidth=.75
+            )
+        p.set_xlabel('dia N')
+        p.set_ylabel('irradiación media por día W/m2')
+        p.legend()
 
-def plot_temperature(weather:DataFrame,path:str):
+def render_temperature(file:str,weather:DataFrame)->None:
     """temperature max,min, avg  line plot"""
-    plt.figure(figsize=(10,4))
-    p = plt.subplot()
-    w = weather
-    g_max= w[['month','day','T2M',]].groupby(['month','day'],as_index=False).max()
-    g_min= w[['month','day','T2M',]].groupby(['month','day'],as_index=False).min()
-    g_men= w[['month','day','T2M',]].groupby(['month','day'],as_index=False).mean()
-    p.plot(
-        g_men.index,
-        g_men['T2M'],
-        label='T° media [°C]',
-        linewidth=.75,
-        )
-    p.fill_between(
-        g_men.index,
-        g_max['T2M'],
-        g_min['T2M'],
-        alpha=.5,
-        color='orange',
-        label='T [°C] max/min'
-        )
-
-    p.set_xlabel('dia N')
-    p.set_ylabel('Temp Promedio [°C]')
-    plt.legend()
-    plt.savefig(path+'plot_temperature'+'.png',dpi=350)
+    with _figure(file,dpi=350,figsize=(10,4)) as fig:
+        p = fig.add_subplot()
+        g = weather[['month','day','T2M',]].groupby(['month','day'],as_index=False)['T2M']
+        g_max,g_min,g_men = g.max(),g.min(),g.mean()
+        p.plot(
+            g_men.index,
+            g_men['T2M'],
+            label='T° media [°C]',
+            linewidth=.75,
+            )
+        p.fill_between(
+            g_men.index,
+            g_max['T2M'],
+            g_min['T2M'],
+            alpha=.5,
+            color='orange',
+            label='T [°C] max/min'
+            )
 
-def plot_components(project:Project,path:str):
-    """plot components cost pie plot"""
+        p.set_xlabel('dia N')
+        p.set_ylabel('Temp Promedio [°C]')
+        p.legend()
+
+def components_table(project:Project)->DataFrame:
+    """items and overloads cost, fractions under 4% merged as 'otros'"""
 
     def _plot_comp_t(bi:BucketItem)->dict[str,float]:
         return {
@@ -193,148 +375,176 @@ def plot_components(project:Project,path:str):
 
         return [*bigger_than,{'gloss':'otros','description':'otros','row_total':smallr_summ}]
 
-    bkt_list = _merge_smallest_items(bkt_list)
-
-    #into DF
-    bkt_df:DataFrame = DataFrame.from_dict(data=bkt_list) #only items and overloads
-
-    plt.figure(figsize=(7,5))
-    p = plt.subplot()
-
-    colors = plt.get_cmap('Blues')(np.linspace(0.2, 0.7, bkt_df.index.size))
-    p.pie(
-        bkt_df['row_total'],
-        labels = bkt_df['description'],
-        # labeldistance=1.5,
-        colors=colors,
-        autopct='%1.1f%%',
-        pctdistance=0.8,
-        startangle=45,
-        )
-    p.set_xlabel('')
-    p.set_ylabel('')
-    p.legend().remove()
-    plt.savefig(path+'plot_components'+'.png',dpi=350,)
-
-def plot_components_irr(project:Project,path:str):
-    """plot each generation component irradiance on surface"""
-
-    modules = project.production_array()
-    n_modules=len(modules )
-    fig,axs = plt.subplots(n_modules,1,layout='constrained')
-    fig.dpi = 300
-    fig.set_size_inches(9,7)
-
-    for i,module in enumerate(modules):
-
-        #pivot table
-        pivot = module.fillna(0).pivot_table(
-            index='month',
-            columns='hour',
-            values='IRR_incident'
+    #into DF, only items and overloads
+    return DataFrame.from_dict(data=_merge_smallest_items(bkt_list))
+
+def flux_table(fin:Mapping[str,Any])->DataFrame:
+    """yearly and accumulated cash flow, fin as economical_analysis(fmt=False)"""
+    return DataFrame({"flujo":fin['flux'],"acumulado":fin['accumulated']})
+
+def render_components(file:str,table:DataFrame)->None:
+    """components cost pie plot, table as components_table"""
+    with _figure(file,dpi=350,figsize=(7,5)) as fig:
+        p = fig.add_subplot()
+        colors = colormaps['Blues'](np.linspace(0.2, 0.7, table.index.size))
+        p.pie(
+            table['row_total'],
+            labels = table['description'],
+            # labeldistance=1.5,
+            colors=colors,
+            autopct='%1.1f%%',
+            pctdistance=0.8,
+            startangle=45,
             )
-        #meshgrid
-        x,y = np.meshgrid(pivot.columns,pivot.index)
-        z = pivot.values
-        levels = np.linspace(0,1000,21)
+        p.set_xlabel('')
+        p.set_ylabel('')
 
-        #matplotlib returns an array on subplots(n,m) > 2x2
-        if n_modules == 1:
-            a = axs
-        else:
-            a = axs[i]
+def render_components_irr(file:str,pivots:list[DataFrame])->None:
+    """each generation component irradiance on surface, pivots month x hour"""
+    with _figure(file,figsize=(9,7),layout='constrained') as fig:
+        axs = fig.subplots(len(pivots),1,squeeze=False)[:,0]
+        levels = np.linspace(0,1000,21)
 
-        cs= a.contourf(x,y,z,levels=levels,cmap='plasma')
-        a.set_xlabel(f'24H (módulo {1+i})')
-        a.set_ylabel('Mes')
+        for i,(a,pivot) in enumerate(zip(axs,pivots)):
+            #meshgrid
+            x,y = np.meshgrid(pivot.columns,pivot.index)
+            cs= a.contourf(x,y,pivot.values,levels=levels,cmap='plasma')
+            a.set_xlabel(f'24H (módulo {1+i})')
+            a.set_ylabel('Mes')
+            fig.colorbar(cs,ax=a)
 
-        plt.colorbar(cs)
         fig.suptitle('Irradiación Incidente media horaria [kW/m2]')
-        plt.savefig(path+'plot_components_irr'+'.png',dpi=300)
 
-def plot_components_production(project:Project,path:str):
-    """plot energy generation on 12 month, line plot"""
-    #plot_components_production
-    #source
-    modules = project.production_array()
-    #plotter
-    plt.figure(figsize=(10,6))
-    axs = plt.subplot()
-
-    for i,module in enumerate(modules):
-        #pivot table
-        group = module[['month','day','System_capacity_KW']].groupby(['month'],as_index=False).sum()
-        #meshgrid
-        axs.plot(group.index,group['System_capacity_KW'],label=f'modulo {i+1}')
+def render_components_production(file:str,groups:list[DataFrame])->None:
+    """energy generation on 12 month by module, line plot"""
+    with _figure(file,figsize=(10,6)) as fig:
+        axs = fig.add_subplot()
+
+        for i,group in enumerate(groups):
+            axs.plot(group.index,group['System_capacity_KW'],label=f'modulo {i+1}')
+        for group in groups:
+            _point_labels(axs,group.index,group['System_capacity_KW'],group['System_capacity_KW'].round(0).values)
+
         axs.set_xlabel('mes N')
         axs.set_ylabel('Generación kWh/mes')
+        axs.legend()
 
-        for i, value in enumerate(group['System_capacity_KW'].round(0).values):
-            plt.text(group.index[i], group['System_capacity_KW'][i], value, ha='center', va='bottom')
+def render_production_performance(file:str,production_performance:DataFrame)->None:
+    """bar plot of generation, netbilling, total savings"""
+    with _figure(file,figsize=(10,5)) as fig:
+        p = fig.add_subplot()
+        x = production_performance['month']
+        p.plot(x,production_performance['consumption'],'o--',label='demanda')
+        p.plot(x,production_performance['generation'],marker='o',linestyle='dashed',label='generación',linewidth=2)
+        sv=p.bar(x,production_performance['savings'],label='ahorro',width=0.5)
+        nb= p.bar(x,production_performance['netbilling'],label='netbilling',width=0.4)
+        p.bar_label(sv,label_type='center',fmt='%.0f',color='w')
+        p.bar_label(nb,label_type='edge',fmt='%.0f', color='orange')
+
+        p.set_xlabel('mes')
+        p.set_ylabel('energía [kWH]')
+        p.legend()
+
+def render_performance_frequency(file:str,production:DataFrame)->None:
+    """2D diagram for operation frecuencry across a day"""
+    with _figure(file,figsize=(8,5),layout='constrained') as fig:
+        p = fig.add_subplot()
+        hb = p.hexbin(production['hour'],production['System_capacity_KW'],gridsize=12,cmap='plasma')
+        fig.colorbar(hb,ax=p)
+
+        p.set_xlabel('Horario')
+        p.set_ylabel('Potencia [kW]')
+
+def render_flux(file:str,data:DataFrame)->None:
+    """financial analysis profit generation, data with flujo and acumulado columns"""
+    with _figure(file,figsize=(10,4)) as fig:
+        p = fig.add_subplot()
+        bar=p.bar(data.index,data['flujo']/1000,width=.8,label='flujo')
+        p.plot(data.index,data['acumulado']/1000,color='orange',marker='o',linewidth=3,label='flujo acumulado')
+
+        #label
+        p.bar_label(bar,label_type='center',fmt='%.0f',color='w')
+        p.set_xlabel('año')
+        p.set_ylabel('utilidades Miles$CLP')
+
+        accumulated = data['acumulado'].round(0).values/1000
+        _point_labels(p,data.index,accumulated,[f'{value:.0f}' for value in accumulated],color='#045993')
+        p.legend()
+
+def render_tornado(file:str,data:DataFrame,base:float)->None:
+    """NPV swing bars, data as financial.tornado"""
+    with _figure(file,figsize=(10,4)) as fig:
+        p = fig.add_subplot()
+        data = data.iloc[::-1]
+        y = np.arange(len(data))
+        p.barh(y,(data['low']-base)/1000,left=base/1000,color='#d62728',label='cambio mínimo')
+        p.barh(y,(data['high']-base)/1000,left=base/1000,color='#1f77b4',label='cambio máximo')
+        p.axvline(base/1000,color='k',linewidth=1)
+        p.set_yticks(y,data['variable'])
+        p.set_xlabel('VAN Miles$CLP')
+        p.legend()
+
+def render_spider(file:str,data:DataFrame)->None:
+    """NPV lines by change, data as financial.spider"""
+    with _figure(file,figsize=(10,4)) as fig:
+        p = fig.add_subplot()
+        for variable in data.columns:
+            p.plot(data.index,data[variable]/1000,marker='o',label=variable)
+        p.set_xlabel('cambio %')
+        p.set_ylabel('VAN Miles$CLP')
+        p.legend()
+
+def _plot_one(project:Project,path:str,name:str,session:ReportSession|None=None)->None:
+    """render a single report figure in process, from session or just its own datasets"""
+    render,args = plot_jobs(project,session,names=[name])[name]
+    render(path+name+'.png',*args)
 
-    plt.legend()
-    plt.savefig(path+'plot_components_production'+'.png',dpi=300)
+def plot_consumption_forecast(forecast:DataFrame,path:str):
+    """consumption forecast line plot"""
+    render_consumption_forecast(path+'plot_consumption_forecast'+'.png',forecast)
+
+def plot_irradiance(weather:DataFrame,path:str):
+    """irradiance plot saving"""
+    render_irradiance(path+'plot_irradiance'+'.png',weather)
 
-def plot_production_performance(project:Project,path:str):
+def plot_temperature(weather:DataFrame,path:str):
+    """temperature max,min, avg  line plot"""
+    render_temperature(path+'plot_temperature'+'.png',weather)
+
+def plot_components(project:Project,path:str):
+    """plot components cost pie plot"""
+    render_components(path+'plot_components'+'.png',components_table(project))
+
+def plot_components_irr(project:Project,path:str,session:ReportSession|None=None):
+    """plot each generation component irradiance on surface"""
+    _plot_one(project,path,'plot_components_irr',session)
+
+def plot_components_production(project:Project,path:str,session:ReportSession|None=None):
+    """plot energy generation on 12 month, line plot"""
+    _plot_one(project,path,'plot_components_production',session)
+
+def plot_production_performance(project:Project,path:str,session:ReportSession|None=None):
     """bar plot of generation, netbilling, total savings"""
-    #plot_production_performance
-    performance = project.performance(consumptions=['main'])
-    production_performance = performance[['month','consumption','generation','netbilling','savings']]
-
-    plt.figure(figsize=(10,5),dpi=300)
-    p = plt.subplot()
-    x = production_performance['month']
-    p.plot(x,production_performance['consumption'],'o--',label='demanda')
-    p.plot(x,production_performance['generation'],marker='o',linestyle='dashed',label='generación',linewidth=2)
-    sv=p.bar(x,production_performance['savings'],label='ahorro',width=0.5)
-    nb= p.bar(x,production_performance['netbilling'],label='netbilling',width=0.4)
-    p.bar_label(sv,label_type='center',fmt='%.0f',color='w')
-    p.bar_label(nb,label_type='edge',fmt='%.0f', color='orange')
-
-    p.set_xlabel('mes')
-    p.set_ylabel('energía [kWH]')
-
-    plt.legend()
-    plt.savefig(path+'plot_production_performance'+'.png',dpi=300)
-
-def plot_performance_frecuency(project:Project,path:str):
+    _plot_one(project,path,'plot_production_performance',session)
+
+def plot_performance_frecuency(project:Project,path:str,session:ReportSession|None=None):
     """2D diagram for operation frecuencry across a day"""
-    #plot_performance_frequency
-
-    plt.figure(dpi=300,layout='constrained')
-    fig,p = plt.subplots()
-    fig.set_size_inches(8,5)
-    fig.set_dpi(300)
-    x = project.energy_production()['hour']
-    y = project.energy_production()['System_capacity_KW']
-    hb = p.hexbin(x,y,gridsize=12,cmap='plasma')
-    plt.colorbar(hb)
-
-    p.set_xlabel('Horario')
-    p.set_ylabel('Potencia [kW]')
-    fig.legend()
-    plt.savefig(path+'plot_performance_frequency'+'.png',dpi=300)
-
-def plot_flux(project:Project,path:str):
-    """finnacial analysis profit generatio"""
-    #plot_flux
-    fin = project.economical_analysis(currency=Currency.CLP)
+    _plot_one(project,path,'plot_performance_frequency',session)
 
-    plt.figure(figsize=(10,4),dpi=300)
-    data = DataFrame({"flujo":fin['flux'],"acumulado":fin['accumulated']})
-    p = plt.subplot()
-    bar=p.bar(data.index,data['flujo']/1000,width=.8,label='flujo')
-    line=p.plot(data.index,data['acumulado']/1000,color='orange',marker='o',linewidth=3,label='flujo acumulado')
+def plot_flux(project:Project,path:str,session:ReportSession|None=None):
+    """finnacial analysis profit generatio"""
+    _plot_one(project,path,'plot_flux',session)
 
-    #label
-    p.bar_label(bar,label_type='center',fmt='%.0f',color='w')
-    p.set_xlabel('año')
-    p.set_ylabel('utilidades Miles$CLP')
+def plot_tornado(project:Project,path:str,table:DataFrame|None=None):
+    """NPV swing by input at its lowest and highest change"""
+    table = table if table is not None else project.sensitivity()
+    base = table.loc[table['change']==0,'npv'].iloc[0] if (table['change']==0).any() else 0
+    render_tornado(path+'plot_tornado'+'.png',tornado(table),base)
 
-    for i, value in enumerate(data['acumulado'].round(0).values):
-        plt.text(data.index[i], (data['acumulado']/1000)[i], f'{value/1000:.0f}', ha='center', va='bottom',color='#045993',)
-    plt.legend()
-    plt.savefig(path+'plot_flux'+'.png',dpi=300)
+def plot_spider(project:Project,path:str,table:DataFrame|None=None):
+    """NPV by percentage change of each input"""
+    table = table if table is not None else project.sensitivity()
+    render_spider(path+'plot_spider'+'.png',spider(table))
 
 def plot_map(project:Project, path:str):
     #init
@@ -357,11 +567,3 @@ def plot_map(project:Project, path:str):
     ).add_to(map)
 
     map.save(path+'map_location'+'.html')
-
-def map_to_image(html_path:str)->None:
-    """screenshot html map file to png"""
-    hti = Html2Image(browser='edge',size=(640,480),output_path=html_path)
-    hti.screenshot(
-        html_file=html_path+'map_location'+'.html',
-        save_as='map_location'+'.png')
-    print(f'{html_path+'map_location.html'} converted to .png')
@@ -0,0 +1,63 @@
+"""compute once report build session"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Self
+from pandas import DataFrame
+from models.econometrics import Currency
+
+if TYPE_CHECKING:
+    from models.inventory import Project
+
+@dataclass(frozen=True)
+class ReportSession:
+    """
+    Report build session
+    ~~~~
+    every derived dataset a report needs is computed once from the project and shared by
+    context building (both templates), tables and plots. Fields are not reassignable and
+    mappings are read only, frames are shared so consumers must copy before changing them.
+    >>> session = ReportSession.build(project)
+    ... project.context(template,session)
+    ... to_table(project,path,session)
+    ... plotter(project,path,session=session)
+    """
+    forecast:DataFrame
+    base:DataFrame
+    weather:DataFrame
+    production:DataFrame
+    production_array:tuple[DataFrame,...]
+    performance:DataFrame
+    eco:Mapping[str,Any]
+    eco_num:Mapping[str,Any]
+    storage:Mapping[str,Any]|None
+    budget:DataFrame
+
+    @classmethod
+    def build(cls,project:'Project')->Self:
+        """compute project datasets, consumption 'main' and CLP as report does"""
+        return cls(**{name:compute(project) for name,compute in DATASETS.items()})
+
+    @staticmethod
+    def compute(project:'Project',name:str)->Any:
+        """one dataset as build computes it, for consumers needing a single one"""
+        return DATASETS[name](project)
+
+def _storage(project:'Project')->Mapping[str,Any]|None:
+    storage = project.storage()
+    return None if storage is None else MappingProxyType(storage)
+
+#session field -> project dataset
+DATASETS:dict[str,Callable[['Project'],Any]] = {
+    'forecast':lambda project:project.building.consumptions['main'].forecast(),
+    'base':lambda project:project.building.consumptions['main'].to_dataframe(),
+    'weather':lambda project:project.weather.get_data(),
+    'production':lambda project:project.energy_production(),
+    'production_array':lambda project:tuple(project.production_array()),
+    'performance':lambda project:project.performance(consumptions=['main']),
+    'eco':lambda project:MappingProxyType(project.economical_analysis(Currency.CLP,fmt=True)),
+    'eco_num':lambda project:MappingProxyType(project.economical_analysis(Currency.CLP,fmt=False)),
+    'storage':_storage,
+    'budget':lambda project:project.bucket.bucket_df(),
+    }
+
+# End-of-file (EOF)
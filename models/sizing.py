@@ -0,0 +1,142 @@
+"""photovoltaic array sizing over panel quantities"""
+import re
+import numpy as np
+from numpy import ndarray
+from pandas import DataFrame
+from models.components import Component
+from models.econometrics import Currency
+from models.financial import cash_flows, evaluate
+
+CHUNK:int = 256 #quantities evaluated per batch
+
+#number and unit, W or kW with optional peak p, not kWh nor part of a longer word
+POWER_RATING = re.compile(r'(?<![\w.])(\d+(?:\.\d+)?)\s*(k?)wp?(?![a-z])',re.IGNORECASE)
+
+def rated_power(component:Component)->float:
+    """nominal power kW from specification 'power' (eg: '2kW','7.2KWp','450W','0.45 kW'),
+    ValueError if there is no rating or ratings disagree"""
+    power = str(component.specification.data.get('power',''))
+    ratings = {
+        float(value)/(1 if kilo else 1000) for value,kilo in POWER_RATING.findall(power)}
+    if not ratings:
+        raise ValueError(f'no power rating in {component.specification} power={power!r}')
+    if len(ratings) > 1:
+        raise ValueError(f'ambiguous power rating in {component.specification} power={power!r}')
+    return ratings.pop()
+
+def allocate(quantities:ndarray,capacity:ndarray)->ndarray:
+    """(quantities x faces) panels filling faces in given order up to their capacity"""
+    before = np.concatenate([[0],np.cumsum(capacity)[:-1]])
+    return np.clip(np.asarray(quantities)[:,None]-before,0,capacity)
+
+def size_array(
+    unit_generation:ndarray,
+    load:ndarray,
+    month:ndarray,
+    unit_cost:ndarray,
+    injection_price:ndarray,
+    capacity:ndarray,
+    panel_power:float,
+    cost_per_panel:float,
+    fixed_cost:float = 0,
+    overload_rate:float = 0,
+    inverters:dict[str,Component]|None = None,
+    dc_ac_ratio:float = 1.2,
+    quantities:range|ndarray|None = None,
+    target_self_consumption:float|None = None,
+    connection:str = 'netbilling',
+    n_years:int = 10,
+    rate:float = 6/100,
+    escalation:float = 1.0,
+    )->tuple[DataFrame,dict|None]:
+    """
+    PV array sizing
+    ~~~~
+    production is linear in panel quantity: each face production of one panel is computed once,
+    faces are filled best yield first and every quantity is settled and evaluated in batches.
+    >>> args
+    ... unit_generation: (faces x periods) kWh of one panel, periods are hours or months
+    ... load, month: (periods,) consumption kWh and month number (1..12)
+    ... unit_cost, injection_price: (12,) energy price by month
+    ... capacity: (faces,) max panels by face
+    ... panel_power: kW by panel
+    ... inverters: candidate models, cheapest count of one model covering AC power is chosen
+    ... target_self_consumption: min share of generation consumed on site, None maximize NPV
+    >>> result
+    ... table: one row per quantity
+    ... best: highest NPV row meeting target, None if no quantity meets it
+    """
+    unit_generation = np.atleast_2d(np.nan_to_num(np.asarray(unit_generation,dtype=float)))
+    capacity = np.asarray(capacity,dtype=int)
+    order = np.argsort(-unit_generation.sum(axis=1),kind='stable')
+    quantities = np.arange(1,capacity.sum()+1) if quantities is None else np.asarray(quantities,dtype=int)
+    quantities = quantities[(quantities > 0) & (quantities <= capacity.sum())]
+
+    months = np.zeros((len(month),12))
+    months[np.arange(len(month)),np.asarray(month,dtype=int)-1] = 1
+    load = np.nan_to_num(np.asarray(load,dtype=float))
+
+    allocation = np.zeros((len(quantities),len(capacity)),dtype=int)
+    allocation[:,order] = allocate(quantities,capacity[order])
+
+    generation = np.empty(len(quantities))
+    self_consumed = np.empty(len(quantities))
+    income = np.empty(len(quantities))
+    for start in range(0,len(quantities),CHUNK):
+        chunk = slice(start,start+CHUNK)
+        produced = allocation[chunk]@unit_generation #quantities x periods
+        match connection:
+            case 'offgrid':
+                used,injected = produced,np.zeros_like(produced)
+            case 'ongrid':
+                used,injected = np.minimum(produced,load),np.zeros_like(produced)
+            case _:
+                used = np.minimum(produced,load)
+                injected = produced-used
+        generation[chunk] = produced.sum(axis=1)
+        self_consumed[chunk] = used.sum(axis=1)
+        income[chunk] = (used@months)@unit_cost+(injected@months)@injection_price
+
+    #inverter: cheapest count of a single model
+    power = quantities*panel_power
+    inverter_name = np.full(len(quantities),'',dtype=object)
+    inverter_cost = np.zeros(len(quantities))
+    if inverters:
+        names = list(inverters)
+        units = np.array([
+            np.ceil(power/dc_ac_ratio/rated_power(inverters[it])) for it in names]) #models x quantities
+        costs = units*np.array([[float(inverters[it].cost.net(Currency.CLP)[0])] for it in names])
+        best_model = costs.argmin(axis=0)
+        inverter_cost = costs[best_model,np.arange(len(quantities))]
+        inverter_name = np.array([
+            f'{int(units[model,i])} x {names[model]}' for i,model in enumerate(best_model)],dtype=object)
+
+    investment = (fixed_cost+quantities*cost_per_panel+inverter_cost)*(1+overload_rate)
+    result = evaluate(cash_flows(investment,income,n_years,escalation),rate)
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        ratio = np.where(generation > 0,self_consumed/generation,0.0)
+        coverage = self_consumed/load.sum() if load.sum() > 0 else np.zeros(len(quantities))
+
+    table = DataFrame({
+        'panels':quantities,
+        'power_kw':power,
+        'allocation':[tuple(int(n) for n in row) for row in allocation],
+        'inverter':inverter_name,
+        'investment':investment,
+        'generation':generation,
+        'self_consumption':ratio,
+        'coverage':coverage,
+        'income':income,
+        'npv':result.npv,
+        'irr':result.irr,
+        'payback':result.payback,
+        })
+
+    feasible = table if target_self_consumption is None\
+        else table[table['self_consumption'] >= target_self_consumption]
+    if feasible.empty:
+        return table,None
+    return table,feasible.loc[feasible['npv'].idxmax()].to_dict()
+
+# End-of-file (EOF)
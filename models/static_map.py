@@ -0,0 +1,134 @@
+"""static location map from locally cached map tiles"""
+import math
+import os
+from io import BytesIO
+from pathlib import Path
+from threading import get_ident
+from dotenv import dotenv_values
+from PIL import Image, ImageDraw, UnidentifiedImageError
+import requests
+
+class TileCache:
+    """
+    Map tiles local storage
+    ~~~~
+    slippy map tiles (256 px PNG by zoom, x, y) are downloaded once and kept on disk,
+    sites in the same city fall on the same tiles, so later reports render offline.
+    >>> init
+        path: storage folder, default .cache/tiles
+        url: tile server template with {z}, {x}, {y}, default .env.local TILE_URL or OpenStreetMap
+        user_agent: sent to tile server, default .env.local TILE_USER_AGENT or USER_AGENT;
+            OpenStreetMap tile usage policy requires it to identify the app with a contact
+    >>> methods
+        ... .tile(z,x,y)->Image|None: None if missing and can't be downloaded
+    """
+    URL:str = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+    SIZE:int = 256 #px
+    TIMEOUT:int = 20 #seconds
+    USER_AGENT:str = 'energy-report-modeler/1.0 (+https://github.com/ccnmagnoo/energy-report-modeler)'
+
+    def __init__(
+        self,
+        path:str|Path = '.cache/tiles',
+        url:str|None = None,
+        user_agent:str|None = None,
+        ) -> None:
+        config = dotenv_values('.env.local')
+        self.path = Path(path)
+        self.url = url or config.get('TILE_URL') or self.URL
+        self.user_agent = user_agent or config.get('TILE_USER_AGENT') or self.USER_AGENT
+
+    def _file(self,z:int,x:int,y:int)->Path:
+        return self.path/str(z)/str(x)/f'{y}.png'
+
+    def tile(self,z:int,x:int,y:int)->Image.Image|None:
+        """stored tile, downloaded and stored if missing"""
+        file = self._file(z,x,y)
+        if file.exists():
+            try:
+                with Image.open(file) as stored:
+                    return stored.convert('RGB')
+            except (OSError,UnidentifiedImageError):
+                #corrupted entry, fetch again
+                file.unlink(missing_ok=True)
+
+        try:
+            response = requests.get(
+                self.url.format(z=z,x=x,y=y),
+                headers={'User-Agent':self.user_agent},
+                timeout=self.TIMEOUT)
+            if response.status_code != 200:
+                raise requests.HTTPError(f'status {response.status_code}',response=response)
+            image = Image.open(BytesIO(response.content)).convert('RGB')
+        except (requests.RequestException,OSError,UnidentifiedImageError) as error:
+            print(f'map tile {z}/{x}/{y} unavailable ({error})')
+            return None
+
+        #written atomically, several sites may render at once
+        file.parent.mkdir(parents=True,exist_ok=True)
+        tmp = file.with_suffix(f'.{os.getpid()}.{get_ident()}.tmp')
+        image.save(tmp,format='PNG')
+        os.replace(tmp,file)
+        return image
+
+def tile_position(latitude:float,longitude:float,zoom:int)->tuple[float,float]:
+    """fractional slippy map tile (x, y) of a position, web mercator"""
+    n = 2**zoom
+    lat = math.radians(latitude)
+    x = (longitude+180)/360*n
+    y = (1-math.asinh(math.tan(lat))/math.pi)/2*n
+    return x,y
+
+def render_map(
+    file:str,
+    latitude:float,
+    longitude:float,
+    zoom:int = 12,
+    size:tuple[int,int] = (640,480),
+    radius:int = 25,
+    cache:TileCache|None = None,
+    )->bool:
+    """
+    Location map PNG
+    ~~~~
+    tiles around the position are stitched in process and the site drawn over them
+    as folium map: a circle of radius px and a marker at its center.
+    Missing tiles are left blank so a report never fails on the map.
+    >>> result: True if every tile was available
+    """
+    cache = cache or TileCache()
+    width,height = size
+    x,y = tile_position(latitude,longitude,zoom)
+    #pixel of map top left corner in the zoom level
+    left = x*TileCache.SIZE-width/2
+    top = y*TileCache.SIZE-height/2
+
+    image = Image.new('RGB',size,(229,227,223))
+    n = 2**zoom
+    complete = True
+    for tx in range(math.floor(left/TileCache.SIZE),math.floor((left+width)/TileCache.SIZE)+1):
+        for ty in range(math.floor(top/TileCache.SIZE),math.floor((top+height)/TileCache.SIZE)+1):
+            if not 0 <= ty < n:
+                continue
+            tile = cache.tile(zoom,tx%n,ty)
+            complete &= tile is not None
+            if tile is not None:
+                image.paste(tile,(round(tx*TileCache.SIZE-left),round(ty*TileCache.SIZE-top)))
+
+    #site
+    draw = ImageDraw.Draw(image,'RGBA')
+    cx,cy = width/2,height/2
+    draw.ellipse((cx-radius,cy-radius,cx+radius,cy+radius),fill=(51,136,255,51),outline=(51,136,255,255),width=3)
+    draw.polygon([(cx,cy),(cx-9,cy-18),(cx+9,cy-18)],fill=(56,170,221,255))
+    draw.ellipse((cx-11,cy-34,cx+11,cy-12),fill=(56,170,221,255),outline=(255,255,255,255),width=2)
+
+    #tiles license
+    attribution = '© OpenStreetMap contributors'
+    box = draw.textbbox((0,0),attribution)
+    draw.rectangle((width-box[2]-8,height-box[3]-6,width,height),fill=(255,255,255,180))
+    draw.text((width-box[2]-4,height-box[3]-4),attribution,fill=(0,0,0,255))
+
+    image.save(file,format='PNG')
+    return complete
+
+# End-of-file (EOF)
@@ -1,11 +1,17 @@
 """date dependency"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
+import time
 from datetime import datetime,date
 from enum import Enum
+from typing import Literal
+import numpy as np
 import pandas as pd
-from pandas import DataFrame
+from pandas import DataFrame, Series
 import requests
 from models.geometry import GeoPosition
+from models.memo import Revision
+from models.weather_cache import WeatherCache
 
 class WeatherParam(Enum):
     """
@@ -38,21 +44,56 @@ class WeatherParam(Enum):
     WIND_SPEED_10M = 'WS10M'
     WIND_DIR_10M = 'WD10M'
 
+#parameters required by photovoltaic calculus
+PV_PARAMETERS:list[WeatherParam] = [
+    WeatherParam.TEMPERATURE,
+    WeatherParam.DIRECT,
+    WeatherParam.DIFFUSE,
+    WeatherParam.ALBEDO,
+    WeatherParam.ZENITH,
+    WeatherParam.WIND_SPEED_10M,
+    ]
 
 
-class Weather:
+type WeatherMode = Literal['last','tmy']
+
+class Weather(Revision):
     """
     fetch/op Weather data from api
     ~~~~~~~~~~~~~~~~~~~~~~~~~
     weather = Weather(GeoPosition,WeatherParams)
     >>> weather.get_data()->DataFrame
+    >>> weather.get_data(columns=['date',WeatherParam.TEMPERATURE])->DataFrame copy
+    >>> weather.get_column(WeatherParam.TEMPERATURE)->Series, no copy
+    parameters are float32, year int16, month/day/hour int8
 
     modify API request parameters
     >>> weather.parameters = [WeatherParams]
+
+    multi-year data, fetched one year per request
+    >>> weather = Weather(GeoPosition,WeatherParams,years=10,mode='tmy')
+    ... .get_years()->DataFrame: complete years, 8760 hours each (29-feb removed)
+    ... .get_data()->DataFrame: mode 'last' most recent year, 'tmy' typical meteorological year
+
+    responses are stored on local WeatherCache, cache=None disable it
     """
 
     URL = 'https://power.larc.nasa.gov/api/temporal/hourly/point?'
-    _data:DataFrame|None = None
+    TIME_STANDARD = 'LST'
+    TIMEOUT:float = 300 #seconds per request
+    RETRIES:int = 3
+    HOURS:int = 8760 #rows of a complete year in get_years
+    BACKOFF:float = 2.0 #seconds, doubled on each retry
+    #Finkelstein-Schafer weights for typical month selection
+    TMY_WEIGHTS:dict[WeatherParam,float] = {
+        WeatherParam.DIRECT:0.5,
+        WeatherParam.DIFFUSE:0.2,
+        WeatherParam.TEMPERATURE:0.2,
+        WeatherParam.WIND_SPEED_10M:0.1,
+        }
+    cache:WeatherCache|None = WeatherCache()
+    _data:DataFrame|None
+    _years_data:DataFrame|None
     #https://power.larc.nasa.gov/api/temporal/hourly/point?
     # Time=LST
     # &parameters=SZA,T2M
@@ -64,42 +105,189 @@ class Weather:
     # &format=JSON
     def __init__(
         self,geo_position:GeoPosition = GeoPosition(),
-        parameters:list[WeatherParam] = None
+        parameters:list[WeatherParam] = None,
+        cache:WeatherCache|None = ...,
+        years:int = 1,
+        mode:WeatherMode = 'last',
         ) -> None:
+        super().__init__()
         self.geo_position = geo_position
+        self._data:DataFrame|None = None
+        self._years_data:DataFrame|None = None
         self.period = self._last_period()
+        self.years = years
+        self.mode = mode
 
         if parameters is None:
-            self.parameters = [WeatherParam.TEMPERATURE]
+            parameters = [WeatherParam.TEMPERATURE]
 
         self.parameters = parameters
 
+        if cache is not ...:
+            self.cache = cache
+
+
+    def _cache_key(self,period:dict[str,date],variant:str|None=None)->str:
+        return self.cache.key(self.geo_position,self.parameters,period,self.TIME_STANDARD,variant)
 
     def _fetch_data(self)->None:
-        request_url = self._generate_url()
-        response = requests.get(request_url,timeout=10000)
-        result = json.loads(response.text)
+        self.touch()
+        if self.mode == 'tmy':
+            self._data = self._typical_year()
+            return
+
+        self._data = self._fetch_period(self.period)
+
+    def _fetch_period(self,period:dict[str,date])->DataFrame:
+        """one request period, from local cache or api"""
+        if self.cache is not None:
+            stored = self.cache.load(self._cache_key(period))
+            if stored is not None:
+                print('weather cache hit',self.geo_position.latitude,self.geo_position.longitude,period['start'].year)
+                return self._compact(stored)
+
+        request_url = self._generate_url(period)
+        result = self._request(request_url)
+
+        result_df = self._parse(result)
+
+        if self.cache is not None:
+            self.cache.save(self._cache_key(period),result_df)
+
+        return self._compact(result_df)
+
+    def _request(self,request_url:str)->dict:
+        """api call, retrying with exponential backoff on network errors and 429/5xx status"""
+        for attempt in range(self.RETRIES+1):
+            try:
+                response = requests.get(request_url,timeout=self.TIMEOUT)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f'status {response.status_code}',response=response)
+                return json.loads(response.text)
+            except (requests.ConnectionError,requests.Timeout,requests.HTTPError) as error:
+                if attempt == self.RETRIES:
+                    raise
+                wait = self.BACKOFF*2**attempt
+                print(f'weather request failed ({error}), retry in {wait:.0f}s')
+                time.sleep(wait)
+        return {}
+
+    def _periods(self)->list[dict[str,date]]:
+        """consecutive calendar years, ending on last period"""
+        last_year = self.period['end'].year
+        return [
+            {'start':date(year,1,1),'end':date(year,12,31)}
+            for year in range(last_year-self.years+1,last_year+1)
+            ]
+
+    def _period_data(self,period:dict[str,date])->DataFrame:
+        """loaded data when it is this period, so it isn't requested again, else fetched"""
+        if self._data is not None and self.mode == 'last' and period == self.period:
+            return self._data
+        return self._fetch_period(period)
+
+    def get_years(self)->DataFrame:
+        """
+        hourly data for all years, sorted by date
+        ~~~~
+        29-feb is removed and years without exactly HOURS rows (partial current year,
+        gaps in POWER data) are dropped, so columns can be reshaped into (years x hours) arrays.
+        Raises ValueError if no year is complete.
+        """
+        if self._years_data is not None:
+            return self._years_data
+
+        frames = [self._period_data(period) for period in self._periods()]
+        data = pd.concat(frames,ignore_index=True)
+        leap_day = (data['month'] == 2) & (data['day'] == 29)
+        data = data.loc[~leap_day]
+
+        counts = data.groupby('year').size()
+        incomplete = counts[counts != self.HOURS]
+        if len(incomplete) == len(counts):
+            raise ValueError(f'no complete weather year, hours by year: {counts.to_dict()}')
+        if not incomplete.empty:
+            print(f'incomplete weather years dropped, hours by year: {incomplete.to_dict()}')
+            data = data.loc[~data['year'].isin(incomplete.index)]
+
+        self._years_data = data.sort_values('date').reset_index(drop=True)
+
+        return self._years_data
 
+    def _typical_year(self)->DataFrame:
+        """
+        typical meteorological year (TMY)
+        ~~~~
+        for each month select the year whose daily means distribution is closest to
+        the long term one (weighted Finkelstein-Schafer statistic), months keep their original dates.
+        """
+        periods = self._periods()
+        span = {'start':periods[0]['start'],'end':periods[-1]['end']}
+        if self.cache is not None:
+            stored = self.cache.load(self._cache_key(span,'tmy'))
+            if stored is not None:
+                return stored
 
-        #create a list of data list
-        result_df = pd.DataFrame()
-        
-        for param,data_by_hour in result['properties']['parameter'].items():
-            #data[param] = (hourlyData)
-            column = pd.DataFrame(list(data_by_hour.items()),columns=['date',param])
-            result_df[['date',param]] = column
+        data = self.get_years()
+        weights = {
+            param.value:weight for param,weight in self.TMY_WEIGHTS.items()
+            if param.value in data.columns
+            }
+        daily = data.groupby(['year','month','day'],as_index=False)[list(weights)].mean()
 
-        result_df[['year','month','day','hour']] = result_df['date']\
-            .str.extract(r'^(\d{4})(\d{2})(\d{2})(\d{2})$')
+        selected:list[DataFrame] = []
+        for month,month_daily in daily.groupby('month'):
+            years = month_daily['year'].unique()
+            score = np.zeros(len(years))
+            for param,weight in weights.items():
+                long_term = np.sort(month_daily[param].to_numpy())
+                for i,year in enumerate(years):
+                    values = np.sort(month_daily.loc[month_daily['year'] == year,param].to_numpy())
+                    cdf_year = np.arange(1,values.size+1)/values.size
+                    cdf_long = np.searchsorted(long_term,values,side='right')/long_term.size
+                    score[i] += weight*np.abs(cdf_year-cdf_long).mean()
+            best = years[int(np.argmin(score))]
+            selected.append(data.loc[(data['year'] == best) & (data['month'] == month)])
 
-        #format date str to datetime
-        result_df['date'] = result_df['date'].apply(
-            lambda datestr: datetime.strptime(datestr,'%Y%m%d%H')
-            )
-        #remove al inconsistent values
-        result_df = result_df.replace(-999.00,None)
+        typical = pd.concat(selected,ignore_index=True)
 
-        self._data = result_df
+        if self.cache is not None:
+            self.cache.save(self._cache_key(span,'tmy'),typical)
+
+        return typical
+
+    @staticmethod
+    def _parse(result:dict)->DataFrame:
+        """
+        NASA POWER json into columnar DataFrame
+        ~~~~
+        >>> columns
+        ... date: datetime64, from YYYYMMDDHH keys
+        ... parameters: float64, missing values (-999) as NaN
+        ... year: int16, month/day/hour: int8
+        """
+        parameters:dict[str,dict[str,float]] = result['properties']['parameter']
+        keys:list[str] = list(next(iter(parameters.values())).keys())
+
+        columns:dict[str,np.ndarray] = {
+            'date':pd.to_datetime(keys,format='%Y%m%d%H').to_numpy(),
+            }
+        for param,data_by_hour in parameters.items():
+            if list(data_by_hour.keys()) == keys:
+                values = np.fromiter(data_by_hour.values(),dtype=np.float64,count=len(keys))
+            else:#unaligned hours
+                values = pd.Series(data_by_hour,dtype=np.float64).reindex(keys).to_numpy()
+            #remove al inconsistent values
+            values[values == -999.0] = np.nan
+            columns[param] = values
+
+        stamps = pd.DatetimeIndex(columns['date'])
+        columns['year'] = stamps.year.to_numpy(dtype=np.int16)
+        columns['month'] = stamps.month.to_numpy(dtype=np.int8)
+        columns['day'] = stamps.day.to_numpy(dtype=np.int8)
+        columns['hour'] = stamps.hour.to_numpy(dtype=np.int8)
+
+        return DataFrame(columns)
 
     def _last_period(self)->dict[str,date]:
         '''
@@ -114,17 +302,18 @@ class Weather:
 
         return str(user_date.year) + str(user_date.month).zfill(2) + str(user_date.day).zfill(2)
 
-    def _generate_url(self)->str:
+    def _generate_url(self,period:dict[str,date]|None=None)->str:
+        period = period or self.period
         param_chain = ','.join(map(lambda param:param.value,self.parameters))
 
         config = {
-            'Time':'LST',
+            'Time':self.TIME_STANDARD,
             'parameters':param_chain,
             'community':'RE',
             'latitude':self.geo_position.latitude,
             'longitude':self.geo_position.longitude,
-            'start':self._date_api_format(self.period['start']),
-            'end':self._date_api_format(self.period['end']),
+            'start':self._date_api_format(period['start']),
+            'end':self._date_api_format(period['end']),
             'format':'JSON'
         }
 
@@ -136,9 +325,106 @@ class Weather:
         print('api request URL',request_url)
         return request_url
 
-    def get_data(self)->DataFrame:
-        """get weather data from api, or one stored in instance"""
+    @staticmethod
+    def _compact(data:DataFrame)->DataFrame:
+        """float32 weather parameters and small integer calendar columns"""
+        dtypes:dict[str,type] = {
+            name:np.float32 for name,column in data.items() if column.dtype.kind == 'f'
+            }
+        dtypes.update({'year':np.int16,'month':np.int8,'day':np.int8,'hour':np.int8})
+        return data.astype({name:dtype for name,dtype in dtypes.items() if name in data.columns})
+
+    def require(self,columns:list[str|WeatherParam])->list[str]:
+        """
+        fetch data if needed and check columns are available, returns column names
+        ... parameters missing before the first fetch are added to the request
+        """
+        names = [getattr(it,'value',it) for it in columns]
+
         if self._data is None:
+            extra = [it for it in WeatherParam if it.value in names and it not in self.parameters]
+            self.parameters = [*self.parameters,*extra]
             self._fetch_data()
 
-        return self._data
+        missing = [it for it in names if it not in self._data.columns]
+        if missing:
+            raise ValueError(f'weather columns not available: {missing}')
+
+        return names
+
+    def get_data(self,columns:list[str|WeatherParam]|None=None)->DataFrame:
+        """
+        get weather data from api, or one stored in instance
+        >>> columns
+        ... None: all columns, the stored frame itself (don't modify it)
+        ... [WeatherParam|'date'|'year'|'month'|'day'|'hour']: new frame with a copy of those columns,
+        ... use get_column to read one column without copying
+        """
+        if columns is None:
+            if self._data is None:
+                self._fetch_data()
+            return self._data
+
+        names = self.require(columns)
+        return self._data[names]
+
+    def get_column(self,column:str|WeatherParam)->Series:
+        """one stored column as Series, without copy (don't modify it)"""
+        name, = self.require([column])
+        return self._data[name]
+
+def prefetch_weather(
+    positions:list[GeoPosition],
+    parameters:list[WeatherParam]|None = None,
+    years:int = 1,
+    cache:WeatherCache|None = None,
+    max_workers:int = 4,
+    )->dict[str,list]:
+    """
+    Portfolio weather prefetch
+    ~~~~
+    fill the weather cache for many sites with bounded concurrent requests,
+    sites on the same POWER grid cell are requested once,
+    failed requests don't stop the others.
+    >>> result
+    ... fetched: [(latitude,longitude,year)] requested to api
+    ... cached: [(latitude,longitude,year)] already stored
+    ... failed: [(latitude,longitude,year,error)]
+    """
+    parameters = parameters or PV_PARAMETERS
+    cache = cache or Weather.cache
+    if cache is None:
+        raise ValueError('prefetch requires a WeatherCache')
+
+    #unique requests by cache key
+    jobs:dict[str,tuple[Weather,dict[str,date]]] = {}
+    for position in positions:
+        weather = Weather(position,parameters,cache=cache,years=years)
+        for period in weather._periods():# pylint: disable=protected-access
+            jobs.setdefault(weather._cache_key(period),(weather,period))# pylint: disable=protected-access
+
+    summary:dict[str,list] = {'fetched':[],'cached':[],'failed':[]}
+    pending:dict[str,tuple[Weather,dict[str,date]]] = {}
+    for key,(weather,period) in jobs.items():
+        site = (weather.geo_position.latitude,weather.geo_position.longitude,period['start'].year)
+        if key in cache:
+            summary['cached'].append(site)
+        else:
+            pending[key] = (weather,period)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(weather._fetch_period,period):(weather,period)# pylint: disable=protected-access
+            for weather,period in pending.values()
+            }
+        for future in as_completed(futures):
+            weather,period = futures[future]
+            site = (weather.geo_position.latitude,weather.geo_position.longitude,period['start'].year)
+            try:
+                future.result()
+                summary['fetched'].append(site)
+            except Exception as error:# pylint: disable=broad-exception-caught
+                print('weather prefetch failed',site,error)
+                summary['failed'].append((*site,error))
+
+    return summary
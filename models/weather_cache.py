@@ -0,0 +1,163 @@
+"""local storage for weather api responses"""
+import hashlib
+import os
+import time
+from datetime import date
+from pathlib import Path
+from threading import Lock, get_ident
+import numpy as np
+from pandas import DataFrame
+from models.geometry import GeoPosition
+
+class WeatherCache:
+    """
+    NASA POWER local storage
+    ~~~~
+    parsed weather frames are stored on disk as columnar binary files (.npz, one
+    array per column), so a site already studied loads without network.
+    >>> init
+        path: storage folder, default .cache/weather
+        ttl: seconds before an entry expires, default 180 days
+        max_size: bytes on disk, least recently used entries are evicted above it
+    >>> methods
+        ... .key(geo_position,parameters,period,time_standard,variant)->str
+        ... .load(key)->DataFrame|None
+        ... .save(key,DataFrame)
+        ... .evict()
+        ... .clear()
+
+    POWER solar data comes in 1° cells and meteorology in 0.5°x0.625° cells,
+    sites are rounded to the finer grid, so near buildings share the same entry.
+    """
+    GRID:tuple[float,float] = (0.5,0.625) #latitude, longitude degrees
+    VERSION:int = 2 #stored frame layout, bump when Weather parser changes
+    _CREATED = '__created__'
+
+    def __init__(
+        self,
+        path:str|Path = '.cache/weather',
+        ttl:float = 180*24*3600,#seconds
+        max_size:int = 256*1024**2,#bytes
+        ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = Lock()
+
+    @classmethod
+    def grid_cell(cls,geo_position:GeoPosition)->tuple[float,float]:
+        """center of POWER grid cell containing this position"""
+        lat_step,lon_step = cls.GRID
+        return (
+            round(round(geo_position.latitude/lat_step)*lat_step,4),
+            round(round(geo_position.longitude/lon_step)*lon_step,4),
+            )
+
+    def key(self,
+            geo_position:GeoPosition,
+            parameters:list,
+            period:dict[str,date],
+            time_standard:str = 'LST',
+            variant:str|None = None,
+            )->str:
+        """unique request identifier, independent of parameter order,
+        variant tags frames derived from the api response (eg: 'tmy')"""
+        latitude,longitude = self.grid_cell(geo_position)
+        params = ','.join(sorted(getattr(it,'value',str(it)) for it in parameters))
+        chain = f"{self.VERSION}|{latitude}|{longitude}|{params}|{period['start']}|{period['end']}|{time_standard}"
+        if variant:
+            chain += f'|{variant}'
+        return hashlib.sha1(chain.encode('utf-8')).hexdigest()
+
+    def _file(self,key:str)->Path:
+        return self.path/f'{key}.npz'
+
+    def load(self,key:str)->DataFrame|None:
+        """stored frame, None if missing or expired"""
+        file = self._file(key)
+        if not file.exists():
+            return None
+
+        try:
+            with np.load(file,allow_pickle=False) as stored:
+                created = float(stored[self._CREATED])
+                if time.time()-created > self.ttl:
+                    file.unlink(missing_ok=True)
+                    return None
+                frame = DataFrame({
+                    name:stored[name] for name in stored.files if name != self._CREATED
+                    })
+        except (OSError,ValueError,KeyError):
+            #corrupted entry, fetch again
+            file.unlink(missing_ok=True)
+            return None
+
+        #string columns back to python objects
+        for name in frame.columns:
+            if frame[name].dtype.kind == 'U':
+                frame[name] = frame[name].astype(object)
+
+        #recently used
+        os.utime(file)
+        return frame
+
+    def save(self,key:str,data:DataFrame)->None:
+        """store frame columns, written atomically"""
+        self.path.mkdir(parents=True,exist_ok=True)
+        columns:dict[str,np.ndarray] = {}
+        for name,column in data.items():
+            if column.dtype == object:
+                columns[str(name)] = column.to_numpy(dtype=str)
+            else:
+                columns[str(name)] = column.to_numpy()
+        columns[self._CREATED] = np.array(time.time())
+
+        file = self._file(key)
+        tmp = file.with_suffix(f'.{os.getpid()}.{get_ident()}.tmp')
+        with open(tmp,'wb') as buffer:
+            np.savez(buffer,**columns)
+        os.replace(tmp,file)
+
+        self.evict()
+
+    def evict(self)->None:
+        """remove expired entries, then least recently used until max_size"""
+        if not self.path.exists():
+            return
+
+        with self._lock:
+            entries = []
+            for file in self.path.glob('*.npz'):
+                try:
+                    stat = file.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime,stat.st_size,file))
+
+            now = time.time()
+            alive = []
+            for used,size,file in entries:
+                #mtime is refreshed on use, so only unused entries expire here
+                if now-used > self.ttl:
+                    file.unlink(missing_ok=True)
+                else:
+                    alive.append((used,size,file))
+
+            alive.sort(key=lambda it:it[0])
+            total = sum(size for _,size,_ in alive)
+            while alive and total > self.max_size:
+                _,size,file = alive.pop(0)
+                file.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self)->None:
+        """remove all entries"""
+        if not self.path.exists():
+            return
+        for file in self.path.glob('*.npz'):
+            file.unlink(missing_ok=True)
+
+    def __contains__(self,key:str)->bool:
+        return self._file(key).exists()
+
+# End-of-file (EOF)
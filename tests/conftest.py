@@ -0,0 +1,43 @@
+"""tests run from repository root, models importable without install"""
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+import pytest
+
+sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
+
+from models import weather as weather_module # pylint: disable=wrong-import-position
+
+class _Response:
+    def __init__(self,payload:dict) -> None:
+        self.status_code = 200
+        self.text = json.dumps(payload)
+
+class FakePower:
+    """requests.get stand-in for NASA POWER, every requested parameter valued by hour
+    of day for the requested days, hours (YYYYMMDDHH) in missing are left out as POWER gaps"""
+    def __init__(self) -> None:
+        self.calls:list[str] = []
+        self.missing:set[str] = set()
+
+    def __call__(self,url:str,timeout=None,**_):
+        self.calls.append(url)
+        query = dict(it.split('=',1) for it in url.split('?',1)[1].split('&'))
+        start = datetime.strptime(query['start'],'%Y%m%d')
+        end = datetime.strptime(query['end'],'%Y%m%d')+timedelta(hours=23)
+        hours = pd.date_range(start,end,freq='h')
+        values = {
+            key:float(i%24) for i,it in enumerate(hours)
+            if (key := it.strftime('%Y%m%d%H')) not in self.missing
+            }
+        parameters = query['parameters'].split(',')
+        return _Response({'properties':{'parameter':{it:values for it in parameters}}})
+
+@pytest.fixture(name='power')
+def fixture_power(monkeypatch)->FakePower:
+    """POWER api replaced by FakePower"""
+    fake = FakePower()
+    monkeypatch.setattr(weather_module.requests,'get',fake)
+    return fake
@@ -0,0 +1,154 @@
+"""hourly battery dispatch and bank sizing"""
+import numpy as np
+import pandas as pd
+import pytest
+from models.bucket import Bucket
+from models.energy_storage import Battery, regime_mask, simulate_dispatch, size_bank
+from models.inventory import Project
+from models.load_profile import hourly_load
+
+#two days: sunny noon surplus, evening and night load
+PRODUCTION = np.tile(np.where((np.arange(24) >= 9) & (np.arange(24) < 17),6.0,0.0),2)
+LOAD = np.tile(np.where(np.arange(24) >= 7,2.0,1.0),2)
+
+def test_soc_within_depth_of_discharge():
+    capacity = np.array([0.,5.,10.,40.])
+    result = simulate_dispatch(PRODUCTION,LOAD,capacity,depth_of_discharge=0.6,initial_soc=0.5,keep_soc=True)
+
+    assert result.soc.shape == (PRODUCTION.size,capacity.size)
+    assert np.all(result.soc <= capacity+1e-9)
+    assert np.all(result.soc >= capacity*(1-0.6)-1e-9)
+    assert np.isclose(result.soc[:,1:].min(axis=0),capacity[1:]*(1-0.6)).all()
+
+def test_efficiency_applied_once_each_way():
+    #one surplus hour charges, one deficit hour discharges
+    result = simulate_dispatch(
+        production=[10.,0.],
+        load=[0.,100.],
+        capacity=100.,
+        charge_efficiency=0.9,
+        discharge_efficiency=0.8,
+        depth_of_discharge=1.0,
+        initial_soc=0.0,
+        keep_soc=True,
+        )
+
+    assert result.charged[0] == pytest.approx(9.0)
+    assert result.discharged[0] == pytest.approx(9.0*0.8)
+    assert result.soc[:,0] == pytest.approx([9.0,0.0])
+    assert result.unmet[0] == pytest.approx(100-9.0*0.8)
+
+def test_surplus_over_capacity_is_curtailed():
+    result = simulate_dispatch([10.],[0.],capacity=4.,charge_efficiency=0.8,initial_soc=0.0)
+
+    assert result.charged[0] == pytest.approx(4.0)
+    assert result.curtailment[0] == pytest.approx(10-4.0/0.8)
+
+def test_load_outside_schedule_is_zero():
+    dates = pd.date_range('2024-01-05','2024-01-07 23:00',freq='h') #friday to sunday
+    schedule = regime_mask(dates,'8/5')
+    load = np.ones(len(dates))
+    result = simulate_dispatch(np.zeros(len(dates)),load,capacity=0.,schedule=schedule)
+
+    assert schedule.sum() == 8
+    assert schedule[9] and not schedule[8] and not schedule[17]
+    assert result.load == 8
+    assert result.unmet[0] == 8
+
+def test_regime_hours():
+    dates = pd.date_range('2024-01-01','2024-01-07 23:00',freq='h') #monday to sunday
+
+    assert regime_mask(dates,'24/7').all()
+    assert regime_mask(dates,'16/7').sum() == 7*16
+    assert regime_mask(dates,'24/5').sum() == 5*24
+
+def test_zero_capacity_is_grid_import():
+    result = simulate_dispatch(PRODUCTION,LOAD,capacity=[0.])
+
+    assert result.unmet[0] == pytest.approx(np.maximum(LOAD-PRODUCTION,0).sum())
+    assert result.curtailment[0] == pytest.approx(np.maximum(PRODUCTION-LOAD,0).sum())
+    assert result.charged[0] == result.discharged[0] == result.cycles[0] == 0
+
+def test_bank_meets_self_sufficiency_target():
+    table,best = size_bank(PRODUCTION,LOAD,unit_storage=3.,unit_cost=100.,
+                           quantities=range(1,21),target_self_sufficiency=0.8)
+    meeting = table[table['self_sufficiency'] >= 0.8]
+
+    assert best['self_sufficiency'] >= 0.8
+    assert best['quantity'] == meeting['quantity'].min()
+    assert table.loc[table['quantity'] == best['quantity']-1,'self_sufficiency'].iloc[0] < 0.8
+
+def test_bank_meets_autonomy_target():
+    _,best = size_bank(PRODUCTION,LOAD,unit_storage=3.,unit_cost=100.,
+                       quantities=range(1,21),hours_autonomy=4,depth_of_discharge=0.5)
+    #mean demand on load hours is 1.7 kWh
+    usable = best['quantity']*3.*0.5*0.95
+
+    assert best['hours_autonomy'] >= 4
+    assert usable/LOAD.mean() >= 4 > (usable-3.*0.5*0.95)/LOAD.mean()
+
+def test_unreachable_target_has_no_bank():
+    #production is a third of load, no bank supplies 90%
+    table,best = size_bank(PRODUCTION*0.3,LOAD,unit_storage=3.,unit_cost=100.,
+                           quantities=range(1,21),target_self_sufficiency=0.9,initial_soc=0.0)
+
+    assert best is None
+    assert len(table) == 20
+
+def test_zero_load_takes_smallest_bank():
+    table,best = size_bank(PRODUCTION,np.zeros_like(LOAD),unit_storage=3.,unit_cost=100.,
+                           quantities=range(1,6),target_self_sufficiency=1.0,hours_autonomy=2)
+
+    assert np.isinf(table['hours_autonomy']).all()
+    assert (table['self_sufficiency'] == 1).all()
+    assert best['quantity'] == 1
+
+class _Building:
+    """building stand-in, january demand only"""
+    def __init__(self,energy:float) -> None:
+        self.energy = energy
+
+    def consumption_forecast(self,group:list[str])->pd.DataFrame:
+        return pd.DataFrame({'month':range(1,13),'energy':[self.energy,*[0.0]*11]})
+
+    def hourly_consumption(self,group:list[str],dates=None,profile=None)->np.ndarray:
+        monthly = self.consumption_forecast(group)['energy'].to_numpy()
+        return hourly_load(monthly,profile or '24/7',dates)
+
+def _project(production:np.ndarray)->Project:
+    """project over january hourly production, without weather nor exchanges requests"""
+    project = Project.__new__(Project)
+    project.building = _Building(1000.)
+    project.components = {}
+    project.bucket = Bucket()
+    frame = pd.DataFrame({
+        'date UTC':pd.date_range('2024-01-01','2024-01-31 23:00',freq='h'),
+        'System_capacity_KW':production,
+        })
+    project.energy_production = lambda:frame
+    return project
+
+JANUARY = np.tile(PRODUCTION[:24],31)
+
+def test_project_storage_meets_target():
+    project = _project(JANUARY)
+    table,best = project.size_storage('24/7',target_self_sufficiency=0.8)
+
+    assert len(table) == 200
+    assert best['self_sufficiency'] >= 0.8
+    assert best['quantity'] == table.loc[table['self_sufficiency'] >= 0.8,'quantity'].min()
+
+    added = project.add_optimal_storage('storage','24/7',target_self_sufficiency=0.8)
+    battery, = project.components['storage']
+
+    assert added == best
+    assert isinstance(battery,Battery)
+    assert battery.quantity == best['quantity']
+
+def test_project_unreachable_target_adds_nothing():
+    project = _project(np.zeros_like(JANUARY))
+
+    assert project.add_optimal_storage('storage','24/7',target_self_sufficiency=0.9) is None
+    assert 'storage' not in project.components
+
+# End-of-file (EOF)
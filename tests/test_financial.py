@@ -0,0 +1,110 @@
+"""financial evaluation and Monte Carlo draws"""
+import numpy as np
+import pytest
+from models.financial import Uncertainty, cash_flows, evaluate, irr, lcoe, monte_carlo, npv, payback
+
+def test_npv_textbook():
+    assert npv(0.1,[-1000,300,400,500])[0] == pytest.approx(-21.0368,abs=1e-4)
+    assert np.allclose(npv([0.0,0.1],[[-1000,300,400,500]]*2),[200,-21.0368],atol=1e-4)
+
+def test_irr_textbook():
+    assert irr([-100,39,59,55,20])[0] == pytest.approx(0.280948,abs=1e-6)
+    assert irr([-100,0,0,0,110])[0] == pytest.approx(1.1**0.25-1)
+
+def test_irr_negative():
+    assert irr([-100,50,40])[0] == pytest.approx(-0.069926,abs=1e-6)
+
+def test_irr_undefined_is_nan():
+    rates = irr([
+        [100,10,10],#no investment
+        [-100,-10,-10],#no income
+        [-1,3,-3],#sign changes without real root, Newton never settles
+        [-100,0.5,0],#root under -99%
+        [0,0,0],
+        ])
+
+    assert np.isnan(rates).all()
+
+def test_irr_rows_independent():
+    rates = irr([[-100,39,59,55,20],[-1,3,-3,0,0],[-100,50,40,0,0]])
+
+    assert rates[0] == pytest.approx(0.280948,abs=1e-6)
+    assert np.isnan(rates[1])
+    assert rates[2] == pytest.approx(-0.069926,abs=1e-6)
+
+def test_payback_fraction():
+    flows = [-100]+[30]*5
+
+    assert payback(flows)[0] == pytest.approx(3.3333,abs=1e-4)
+    #discounted: 27.27+24.79+22.54 recovered after 3 years, 25.38 left of 18.63 in year 4
+    assert payback(flows,0.1)[0] == pytest.approx(4.2633,abs=1e-4)
+    assert payback([0,10])[0] == 0
+
+def test_payback_never_recovered():
+    assert np.isnan(payback([-100,10,10,10])).all()
+
+def test_lcoe_discounts_costs_and_energy():
+    levelized = lcoe([[1000,10,10]],[[0,100,100]],0.05)[0]
+    expected = (1000+10/1.05+10/1.05**2)/(100/1.05+100/1.05**2)
+
+    assert levelized == pytest.approx(expected)
+    assert lcoe([[1000,10,10]],[[0,100,100]],0.0)[0] == pytest.approx(1020/200)
+
+def test_evaluate_batch():
+    flows = cash_flows(investment=[100,100],income=30,n_years=[5,2])
+    result = evaluate(flows,0.1,energy=np.array([0,10,10,10,10,10]))
+
+    assert flows.shape == (2,6)
+    assert result.payback[0] == pytest.approx(3.3333,abs=1e-4)
+    assert np.isnan(result.payback[1])
+    assert result.irr[1] == pytest.approx(irr([-100,30,30])[0])
+    assert result.irr[1] < 0
+    assert result.lcoe[0] == pytest.approx(100/(10*(1-1.1**-5)/0.1))
+    assert np.isnan(evaluate(flows,0.1).lcoe).all()
+
+#deterministic draws, only weather and degradation as given
+FIXED = Uncertainty(loss_spread=0,escalation_sd=0,exchange_sd=0,degradation=(0,0))
+
+def _monte_carlo(**kwargs):
+    args = {
+        'income':1000.,'investment':5000.,'energy':10_000.,'yearly_energy':[1.,1.],
+        'losses':{'dirt':0.02},'n_years':10,'rate':0.06,'draws':20,'uncertainty':FIXED,'seed':1,
+        }
+    return monte_carlo(**{**args,**kwargs})
+
+def test_without_uncertainty_matches_deterministic():
+    result = _monte_carlo()
+    flows = np.array([-5000.]+[1000.]*10)
+
+    assert np.allclose(result.flows,flows)
+    assert np.allclose(result.npv,(flows/1.06**np.arange(11)).sum())
+    assert np.allclose(result.energy,10_000)
+
+def test_degradation_counted_once():
+    #static degradation loss of deterministic energy is replaced by the yearly one
+    result = _monte_carlo(
+        losses={'dirt':0.02,'degradation':0.015},
+        uncertainty=Uncertainty(loss_spread=0.5,escalation_sd=0,exchange_sd=0,degradation=(0.01,0)),
+        )
+    first = 1000*(1-0.02*np.array([1.5,0.5]))/(1-0.035)
+
+    assert np.all((result.flows[:,1] >= first[0]-1e-9) & (result.flows[:,1] <= first[1]+1e-9))
+    assert np.allclose(result.flows[:,2:]/result.flows[:,1:-1],0.99)
+
+def test_only_degradation_loss_is_not_sampled():
+    result = _monte_carlo(
+        losses={'degradation':0.015},
+        uncertainty=Uncertainty(loss_spread=0.5,escalation_sd=0,exchange_sd=0,degradation=(0,0)),
+        )
+
+    assert np.allclose(result.energy,10_000/(1-0.015))
+
+def test_exceedance_levels():
+    result = _monte_carlo(yearly_energy=np.linspace(0.8,1.2,41),draws=2000)
+    npv = result.exceedance('npv')
+    payback = result.exceedance('payback')
+
+    assert npv['P90'] < npv['P50']
+    assert payback['P90'] > payback['P50']
+
+# End-of-file (EOF)
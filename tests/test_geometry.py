@@ -0,0 +1,41 @@
+"""vectorized sun position against scalar SunPositionCalculator"""
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from models.geometry import GeoPosition, Orientation
+
+SITES = [GeoPosition(-33.45,-70.66),GeoPosition(-53.16,-70.92),GeoPosition(40.42,-3.70)]
+DATES = [
+    datetime(2022,1,1,0,tzinfo=timezone.utc),
+    datetime(2022,3,20,15,30,tzinfo=timezone.utc),
+    datetime(2022,6,21,12,tzinfo=timezone.utc),
+    datetime(2022,12,21,18,45,tzinfo=timezone.utc),
+    ]
+
+def test_sun_positions_match_scalar():
+    for site in SITES:
+        vector = site.sun_positions(pd.DatetimeIndex(DATES))
+        for i,date in enumerate(DATES):
+            scalar = site.sun_position(date)
+
+            assert abs(vector['azimuth'][i]-scalar['azimuth']) < 1e-9
+            assert abs(vector['elevation'][i]-scalar['elevation']) < 1e-9
+
+def test_naive_dates_are_local_solar_time():
+    site = SITES[0]
+    local = [it.replace(tzinfo=None)+timedelta(hours=site.longitude/15) for it in DATES]
+    vector = site.sun_positions(local)
+    scalar = [site.sun_position(it) for it in DATES]
+
+    assert np.allclose(vector['elevation'],[it['elevation'] for it in scalar],atol=1e-9)
+
+def test_cos_phi_array_matches_single_values():
+    orientation = Orientation(inclination=30,azimuth=0)
+    azimuth = np.array([0.,90.,180.,270.,359.])
+    elevation = np.array([60.,10.,45.,-5.,89.])
+    array = orientation.cos_phi(azimuth,elevation)
+
+    assert np.allclose(array,[orientation.cos_phi(a,e) for a,e in zip(azimuth,elevation)])
+    assert array[3] == 0
+
+# End-of-file (EOF)
@@ -0,0 +1,31 @@
+"""hourly load synthesis"""
+import numpy as np
+import pandas as pd
+import pytest
+from models.load_profile import hourly_load
+
+MONTHLY = np.arange(1,13)*100.0
+
+def test_year_required_without_dates():
+    with pytest.raises(ValueError,match='year'):
+        hourly_load(MONTHLY,'office')
+
+def test_months_keep_their_energy():
+    load = hourly_load(MONTHLY,'office',year=2024)
+    month = pd.date_range('2024-01-01','2024-12-31 23:00',freq='h').month
+
+    assert len(load) == 8784
+    assert np.allclose(np.bincount(month,weights=load)[1:],MONTHLY)
+
+def test_weekdays_follow_dates_year():
+    dates = pd.date_range('2022-01-01','2022-01-31 23:00',freq='h')
+    load = hourly_load(MONTHLY,'office',dates)
+    daily = load.reshape(-1,24).sum(axis=1)
+    weekend = dates[::24].dayofweek >= 5
+
+    #2022-01-01 is saturday, office days carry more energy than weekends
+    assert weekend[0] and weekend[1]
+    assert daily[~weekend].min() > daily[weekend].max()
+    assert np.allclose(load,hourly_load(MONTHLY,'office',dates,year=2023))
+
+# End-of-file (EOF)
@@ -0,0 +1,45 @@
+"""revision tokens of memo keys"""
+import gc
+import pickle
+from copy import deepcopy
+from models.bucket import Bucket
+from models.memo import Memo, Revision
+from models.photovoltaic import PvTechnicalSheet
+
+def test_tokens_unique_after_free():
+    seen = set()
+    for _ in range(100):
+        bucket = Bucket()
+        assert bucket.token not in seen
+        seen.add(bucket.token)
+        del bucket
+        gc.collect()
+
+def test_copy_and_pickle_renew_token():
+    sheet = PvTechnicalSheet(power=450)
+    copied = deepcopy(sheet)
+    loaded = pickle.loads(pickle.dumps(sheet))
+
+    assert len({sheet.token,copied.token,loaded.token}) == 3
+    assert copied.power == loaded.power == 450
+
+def test_in_place_change_touches_sheet():
+    sheet = PvTechnicalSheet(power=450)
+    before = sheet.revision
+    sheet.power = 500
+
+    assert sheet.revision == before+1
+
+def test_memo_recomputes_for_other_object():
+    memo = Memo()
+    calls = []
+    def compute(node:Revision):
+        return memo.get('value',(node.token,node.revision),lambda:calls.append(node) or len(calls))
+
+    first,second = Revision(),Revision()
+    assert compute(first) == compute(first) == 1
+    assert compute(second) == 2
+    first.touch()
+    assert compute(first) == 3
+
+# End-of-file (EOF)
@@ -0,0 +1,82 @@
+"""array kernels of Photovoltaic against the former row by row formulas"""
+from datetime import date
+from math import acos, asin, cos, exp, sin
+import numpy as np
+import pytest
+from models.econometrics import Cost, Currency
+from models.geometry import GeoPosition, Orientation
+from models.photovoltaic import Photovoltaic, PvTechnicalSheet, TempCoef
+from models.weather import Weather
+
+@pytest.fixture(name='pv')
+def fixture_pv(power)->Photovoltaic:
+    weather = Weather(GeoPosition(-33.45,-70.66),[*Photovoltaic.PARAMS],cache=None)
+    weather.period = {'start':date(2022,1,1),'end':date(2022,1,2)}
+    return Photovoltaic(
+        weather,
+        quantity=10,
+        cost=Cost(100_000,Currency.CLP),
+        orientation=Orientation(30,0),
+        technical_sheet=PvTechnicalSheet(power=450),
+        )
+
+def _scalar_iam(cos_phi:float)->float:
+    """IAM as formerly computed for each row"""
+    phi = acos(cos_phi)
+    phi_r = asin(sin(phi)/1.526)
+    #numpy scalars as pandas rows were, 0/0 is NaN
+    phi,phi_r = np.float64(phi),np.float64(phi_r)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        tau = exp(-4*0.002/cos(phi_r))*(1-0.5*(
+            (np.sin(phi_r-phi)**2/np.sin(phi_r+phi)**2)+
+            (np.tan(phi_r-phi)**2/np.tan(phi_r+phi)**2)))
+    tau = tau if tau > 0.001 else 0
+    return tau/(exp(-4*0.002)*(1-((1-1.526)/(1+1.526))**2))
+
+def _scalar_capacity(pv:Photovoltaic,incident:float,wind:float)->tuple[float,float]:
+    """cell temperature and capacity kW as formerly computed for each row"""
+    coef = TempCoef.ROOF_MOUNT.value
+    t_cell = incident*exp(coef['alpha']+coef['beta']*wind)+incident*coef['deltaT']/1000
+    nominal = pv.technical_sheet.power*pv.quantity/1000
+    gamma_factor = 1+pv.technical_sheet.thermal.power_coef_t/100*(t_cell-25.5)
+    if incident >= 125:
+        capacity = incident/1000*nominal*gamma_factor
+    else:
+        capacity = 0.008*incident**2/1000*nominal*gamma_factor
+    return t_cell,capacity*0.96*(1-0.15)
+
+def test_reflection_matches_scalar(pv):
+    cos_phi = np.array([0.05,0.2,0.5,0.7071,0.9,0.999])
+    iam = pv._calc_reflection(cos_phi) # pylint: disable=protected-access
+
+    assert np.allclose(iam,[_scalar_iam(it) for it in cos_phi],rtol=1e-12)
+
+def test_reflection_defined_on_normal_incidence(pv):
+    #row formula was 0/0 at cos_phi == 1, the NaN failed the threshold and IAM fell to 0,
+    #the array one takes the Fresnel limit
+    assert _scalar_iam(1.0) == 0
+    assert pv._calc_reflection(np.array([1.0]))[0] == pytest.approx(1.0) # pylint: disable=protected-access
+
+def test_reflection_series_aligned_with_cos_phi(pv):
+    iam = pv._calc_reflection() # pylint: disable=protected-access
+
+    assert iam.index.equals(pv._cos_phi.index) # pylint: disable=protected-access
+    assert not iam.isna().any()
+
+def test_pvwatts_kernel_matches_scalar(pv):
+    incident = np.array([0.,50.,124.9,125.,600.,1000.,1200.])
+    wind = np.array([0.,1.,3.,0.5,2.,6.,10.])
+    t_cell,capacity = pv._pvwatts_kernel(incident,wind) # pylint: disable=protected-access
+    expected = np.array([_scalar_capacity(pv,i,w) for i,w in zip(incident,wind)])
+
+    assert np.allclose(t_cell,expected[:,0],rtol=1e-12)
+    assert np.allclose(capacity,expected[:,1],rtol=1e-12)
+
+def test_pvwatts_kernel_broadcasts(pv):
+    incident = np.array([[200.],[800.]])*np.ones((2,3))
+    _,capacity = pv._pvwatts_kernel(incident,np.array([1.,2.,3.])) # pylint: disable=protected-access
+
+    assert capacity.shape == (2,3)
+    assert capacity[1,0] == pytest.approx(_scalar_capacity(pv,800.,1.)[1])
+
+# End-of-file (EOF)
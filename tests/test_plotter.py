@@ -0,0 +1,30 @@
+"""figure digests of the plot stage"""
+from pandas import DataFrame
+from models import plotter
+from models.plotter import plot_digest
+
+DATA = DataFrame({'month':[1,2],'energy':[10.,20.]})
+
+def _render(file,data):
+    return file,data['energy'].sum(),'kWh'
+
+def test_digest_stable_for_same_inputs():
+    assert plot_digest(_render,(DATA,)) == plot_digest(_render,(DATA.copy(),))
+    assert plot_digest(_render,(DATA,)) != plot_digest(_render,(DATA*2,))
+
+def _edited_render(file,data):
+    return file,data['energy'].sum(),'MWh'
+
+#same renderer after an edit of its label
+_edited_render.__qualname__ = _render.__qualname__
+
+def test_digest_follows_renderer_code():
+    assert plot_digest(_edited_render,(DATA,)) != plot_digest(_render,(DATA,))
+
+def test_digest_follows_plot_version(monkeypatch):
+    before = plot_digest(_render,(DATA,))
+    monkeypatch.setattr(plotter,'PLOT_VERSION',plotter.PLOT_VERSION+1)
+
+    assert plot_digest(_render,(DATA,)) != before
+
+# End-of-file (EOF)
@@ -0,0 +1,77 @@
+"""photovoltaic array sizing"""
+import numpy as np
+import pytest
+from models.components import Component, Specs
+from models.econometrics import Cost, Currency
+from models.sizing import rated_power, size_array
+
+def _inverter(power:str,cost:float=100.)->Component:
+    return Component('Inversor',Specs('Inverter',power=power),Cost(cost,Currency.CLP))
+
+@pytest.mark.parametrize('power,expected',[
+    ('450W',0.45),
+    ('0.45 kW',0.45),
+    ('7.2KWp',7.2),
+    ('10KW',10.0),
+    ('3 kwp',3.0),
+    ('450 Wp (0.45 kW)',0.45),
+    ])
+def test_rated_power(power,expected):
+    assert rated_power(_inverter(power)) == pytest.approx(expected)
+
+@pytest.mark.parametrize('power',['','N/D','10kWh','1.2.3kW'])
+def test_missing_rating_raises(power):
+    with pytest.raises(ValueError,match='no power rating'):
+        rated_power(_inverter(power))
+
+@pytest.mark.parametrize('power',['5kW / 6kW','2 x 3kW, 5kW total','450W or 500W'])
+def test_ambiguous_rating_raises(power):
+    with pytest.raises(ValueError,match='ambiguous'):
+        rated_power(_inverter(power))
+
+def _size(**kwargs):
+    #two faces by month, north face yields twice the east one
+    args = {
+        'unit_generation':np.vstack([np.full(12,20.),np.full(12,40.)]),
+        'load':np.full(12,150.),
+        'month':np.arange(1,13),
+        'unit_cost':np.full(12,150.),
+        'injection_price':np.full(12,80.),
+        'capacity':np.array([4,3]),
+        'panel_power':0.45,
+        'cost_per_panel':100_000.,
+        'inverters':{'small':_inverter('2kW',400_000.),'large':_inverter('5kW',700_000.)},
+        }
+    return size_array(**{**args,**kwargs})
+
+def test_area_limits():
+    table,best = _size(quantities=range(1,20))
+    allocation = np.array(table['allocation'].to_list())
+
+    assert table['panels'].tolist() == list(range(1,8))
+    assert (allocation <= [4,3]).all()
+    assert (allocation.sum(axis=1) == table['panels']).all()
+    #best yield face filled first
+    assert allocation[2].tolist() == [0,3]
+    assert allocation[4].tolist() == [2,3]
+    assert best['panels'] in table['panels'].tolist()
+
+def test_inverter_covers_ac_power():
+    table,_ = _size(dc_ac_ratio=1.2)
+    ratings = {'small':2.0,'large':5.0}
+    for power,inverter in zip(table['power_kw'],table['inverter']):
+        units,name = inverter.split(' x ')
+
+        assert int(units)*ratings[name]*1.2 >= power
+
+    assert table['inverter'].iloc[0] == '1 x small'
+
+def test_target_self_consumption():
+    table,best = _size(target_self_consumption=0.9)
+    unreachable = _size(target_self_consumption=1.01)[1]
+
+    assert best['self_consumption'] >= 0.9
+    assert best['npv'] == table.loc[table['self_consumption'] >= 0.9,'npv'].max()
+    assert unreachable is None
+
+# End-of-file (EOF)
@@ -0,0 +1,44 @@
+"""static map tiles against a local tile server stand-in"""
+from io import BytesIO
+from PIL import Image
+from models import static_map
+from models.static_map import TileCache, render_map
+
+class _Tile:
+    def __init__(self) -> None:
+        buffer = BytesIO()
+        Image.new('RGB',(TileCache.SIZE,TileCache.SIZE),(200,220,240)).save(buffer,format='PNG')
+        self.status_code = 200
+        self.content = buffer.getvalue()
+
+def test_tiles_cached_across_sites(tmp_path,monkeypatch):
+    requests = []
+    def fake_get(url,headers=None,timeout=None):
+        requests.append((url,headers))
+        return _Tile()
+    monkeypatch.setattr(static_map.requests,'get',fake_get)
+    cache = TileCache(tmp_path,user_agent='test-app (test@example.com)')
+
+    assert render_map(str(tmp_path/'a.png'),-33.45,-70.66,cache=cache)
+    fetched = len(requests)
+    assert render_map(str(tmp_path/'b.png'),-33.46,-70.65,cache=cache)
+
+    assert len(requests) == fetched
+    assert all(headers == {'User-Agent':'test-app (test@example.com)'} for _,headers in requests)
+    assert Image.open(tmp_path/'b.png').size == (640,480)
+
+def test_settings_from_env(tmp_path,monkeypatch):
+    monkeypatch.setattr(static_map,'dotenv_values',lambda _:{
+        'TILE_URL':'https://tiles.example.com/{z}/{x}/{y}.png',
+        'TILE_USER_AGENT':'site-reports (ops@example.com)'})
+    cache = TileCache(tmp_path)
+
+    assert cache.url == 'https://tiles.example.com/{z}/{x}/{y}.png'
+    assert cache.user_agent == 'site-reports (ops@example.com)'
+
+def test_default_user_agent_has_contact(tmp_path,monkeypatch):
+    monkeypatch.setattr(static_map,'dotenv_values',lambda _:{})
+
+    assert 'https://' in TileCache(tmp_path).user_agent
+
+# End-of-file (EOF)
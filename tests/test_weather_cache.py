@@ -0,0 +1,77 @@
+"""WeatherCache against a local NASA POWER stand-in"""
+import os
+import time
+from datetime import date
+import pandas as pd
+from models import weather_cache as cache_module
+from models.geometry import GeoPosition
+from models.weather import Weather, WeatherParam
+from models.weather_cache import WeatherCache
+
+PERIOD = {'start':date(2022,1,1),'end':date(2022,1,2)}
+
+def _weather(cache:WeatherCache,latitude:float=-33.45,longitude:float=-70.66)->Weather:
+    weather = Weather(GeoPosition(latitude,longitude),[WeatherParam.TEMPERATURE],cache=cache)
+    weather.period = PERIOD
+    return weather
+
+def test_miss_then_hit(tmp_path,power):
+    cache = WeatherCache(tmp_path)
+    first = _weather(cache).get_data()
+    second = _weather(cache).get_data()
+
+    assert len(power.calls) == 1
+    assert len(first) == 48
+    pd.testing.assert_frame_equal(first,second)
+
+def test_same_grid_cell_shares_entry(tmp_path,power):
+    cache = WeatherCache(tmp_path)
+    _weather(cache,-33.45,-70.66).get_data()
+    _weather(cache,-33.40,-70.70).get_data()
+    _weather(cache,-34.45,-70.66).get_data()
+
+    assert WeatherCache.grid_cell(GeoPosition(-33.45,-70.66)) == WeatherCache.grid_cell(GeoPosition(-33.40,-70.70))
+    assert len(power.calls) == 2
+
+def test_expired_entry_is_fetched_again(tmp_path,power,monkeypatch):
+    cache = WeatherCache(tmp_path,ttl=60)
+    _weather(cache).get_data()
+
+    now = time.time()
+    monkeypatch.setattr(cache_module.time,'time',lambda:now+61)
+    _weather(cache).get_data()
+
+    assert len(power.calls) == 2
+
+def test_least_recently_used_evicted_past_limit(tmp_path):
+    frame = pd.DataFrame({'T2M':range(1000)},dtype=float)
+    cache = WeatherCache(tmp_path)
+    for key in ('a','b'):
+        cache.save(key,frame)
+    size = os.path.getsize(tmp_path/'a.npz')
+
+    now = time.time()
+    os.utime(tmp_path/'a.npz',(now-300,now-300))
+    os.utime(tmp_path/'b.npz',(now-200,now-200))
+    #reading 'a' makes 'b' the least recently used
+    assert cache.load('a') is not None
+
+    cache.max_size = 2*size
+    cache.save('c',frame)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+
+def test_version_bump_invalidates(tmp_path,power,monkeypatch):
+    cache = WeatherCache(tmp_path)
+    _weather(cache).get_data()
+    _weather(cache).get_data()
+    assert len(power.calls) == 1
+
+    monkeypatch.setattr(WeatherCache,'VERSION',WeatherCache.VERSION+1)
+    _weather(cache).get_data()
+
+    assert len(power.calls) == 2
+
+# End-of-file (EOF)
@@ -0,0 +1,31 @@
+"""weather column access"""
+from datetime import date
+import numpy as np
+import pytest
+from models.geometry import GeoPosition
+from models.weather import Weather, WeatherParam
+
+@pytest.fixture(name='weather')
+def fixture_weather(power)->Weather:
+    weather = Weather(GeoPosition(-33.45,-70.66),[WeatherParam.TEMPERATURE],cache=None)
+    weather.period = {'start':date(2022,1,1),'end':date(2022,1,2)}
+    return weather
+
+def test_column_shares_stored_data(weather):
+    column = weather.get_column(WeatherParam.TEMPERATURE)
+    stored = weather.get_data()['T2M']
+
+    assert np.shares_memory(column.to_numpy(),stored.to_numpy())
+
+def test_columns_frame_is_a_copy(weather):
+    frame = weather.get_data(columns=['date',WeatherParam.TEMPERATURE])
+
+    assert list(frame.columns) == ['date','T2M']
+    assert not np.shares_memory(frame['T2M'].to_numpy(),weather.get_data()['T2M'].to_numpy())
+
+def test_unavailable_column_raises(weather):
+    weather.get_data()
+    with pytest.raises(ValueError,match='WS10M'):
+        weather.get_column(WeatherParam.WIND_SPEED_10M)
+
+# End-of-file (EOF)
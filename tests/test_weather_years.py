@@ -0,0 +1,45 @@
+"""multi-year weather with incomplete years"""
+from datetime import date
+import pytest
+from models.geometry import GeoPosition
+from models.weather import Weather, WeatherParam
+
+def _weather(years:int)->Weather:
+    weather = Weather(GeoPosition(-33.45,-70.66),[WeatherParam.TEMPERATURE],cache=None,years=years)
+    weather.period = {'start':date(2022,1,1),'end':date(2022,12,31)}
+    return weather
+
+def test_complete_years_reshape(power):
+    data = _weather(2).get_years()
+
+    assert len(power.calls) == 2
+    assert data.groupby('year').size().to_dict() == {2021:Weather.HOURS,2022:Weather.HOURS}
+
+def test_incomplete_year_dropped(power):
+    power.missing = {'2022063012'}
+    data = _weather(2).get_years()
+
+    assert data['year'].unique().tolist() == [2021]
+    assert len(data) == Weather.HOURS
+
+def test_no_complete_year_raises(power):
+    power.missing = {'2021063012','2022063012'}
+    with pytest.raises(ValueError,match='2022'):
+        _weather(2).get_years()
+
+def test_loaded_period_not_requested_again(power):
+    weather = _weather(1)
+    loaded = weather.get_data()
+    data = weather.get_years()
+
+    assert len(power.calls) == 1
+    assert data['T2M'].equals(loaded['T2M'])
+
+def test_loaded_period_reused_in_multi_year(power):
+    weather = _weather(3)
+    weather.get_data()
+    weather.get_years()
+
+    assert len(power.calls) == 3
+
+# End-of-file (EOF)